@@ -11,7 +11,10 @@
     "depends": [
         "base",
     ],
-    "data": [],
+    "data": [
+        "security/ir.model.access.csv",
+        "views/graphql_persisted_query_views.xml",
+    ],
     "external_dependencies": {
         "python": ["graphql-core"],
     },
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+# Aggregation root fields, computed by Postgres through `read_group`
+# e.g. SaleOrderAggregate(groupBy: ["state", "date_order:month"]) { state date_order count amount_total_sum }
+from odoo.exceptions import ValidationError
+
+AGGREGATE_SUFFIX = "Aggregate"
+AGGREGATE_FUNCTIONS = ("sum", "avg", "min", "max")
+NUMERIC_TYPES = ("integer", "float", "monetary")
+UNGROUPABLE_TYPES = ("one2many", "many2many", "binary", "html", "text", "reference")
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+
+def is_groupable(field):
+    return field.store and field.name != "id" and field.type not in UNGROUPABLE_TYPES
+
+
+def is_aggregatable(field):
+    return field.store and field.name != "id" and field.type in NUMERIC_TYPES
+
+
+def parse_groupby(model, groupby, allowed=None):
+    """Return the `read_group` specification of each grouped field, by field name"""
+    if isinstance(groupby, str):
+        groupby = [groupby]
+    specs = {}
+    for spec in groupby or []:
+        name, _, granularity = spec.partition(":")
+        field = model._fields.get(name)
+        if field is None or not is_groupable(field) or (allowed is not None and name not in allowed):
+            raise ValidationError(f"Cannot group {model._name} by {name}")
+        if granularity and (field.type not in ("date", "datetime") or granularity not in GRANULARITIES):
+            raise ValidationError(f"Invalid granularity for {name}: {granularity}")
+        specs[name] = spec
+    return specs
+
+
+def aggregate_specs(model, fields, groupby, allowed=None):
+    """Return the `read_group` fields computing the selected aggregates
+
+    Aggregates are selected as `<field>_<function>`, the number of records
+    of each group as `count`.
+    """
+    specs = ["__count"]  # Also prevents read_group from aggregating every field
+    for field in fields:
+        if field.name in groupby or field.name == "count":
+            continue
+        if field.name in model._fields:
+            raise ValidationError(f"Field {field.name} must be in groupBy to be selected")
+        name, _, function = field.name.rpartition("_")
+        model_field = model._fields.get(name)
+        if (
+            function not in AGGREGATE_FUNCTIONS
+            or model_field is None
+            or not is_aggregatable(model_field)
+            or (allowed is not None and name not in allowed)
+        ):
+            raise ValidationError(f"Cannot aggregate {field.name} on model {model._name}")
+        specs.append(f"{field.name}:{function}({name})")
+    return list(dict.fromkeys(specs))
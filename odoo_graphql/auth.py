@@ -1,5 +1,54 @@
+import hashlib
+import time
+
 import odoo
-from odoo import api, registry
+
+from .cache import LRUCache
+
+# Seconds during which a verified API key is trusted without checking it again
+TOKEN_CACHE_TTL = 60
+# (dbname, sha256 of the key) -> (uid, expiry)
+_verified_tokens = LRUCache(1024)
+
+
+def get_bearer_token(httprequest):
+    """Return the token of an "Authorization: Bearer <token>" header, None without it"""
+    scheme, _, token = httprequest.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def verify_token(env, token):
+    """Return the id of the user owning the API key `token`, None if it is invalid
+
+    API keys are hashed like passwords: the successful verifications are
+    cached TOKEN_CACHE_TTL seconds, so that only the first request pays
+    for the hashing. A revoked key is refused once its entry expires.
+    """
+    key = (env.cr.dbname, hashlib.sha256(token.encode()).hexdigest())
+    cached = _verified_tokens.get(key)
+    now = time.monotonic()
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    uid = env["res.users.apikeys"]._check_credentials(scope="rpc", key=token)
+    if not uid:
+        return None
+    _verified_tokens.set(key, (uid, now + TOKEN_CACHE_TTL))
+    return uid
+
+
+def clear_verified_tokens():
+    _verified_tokens.clear()
+
+
+def company_context(user, company_id):
+    """Return `user` working in `company_id`, without modifying the user"""
+    company_id = int(company_id)
+    if company_id not in user.company_ids.ids:
+        return None
+    return user.with_context(allowed_company_ids=[company_id])
+
 
 def authenticate_user(dbname, login, password):
     try:
@@ -17,18 +66,21 @@ def authenticate_user(dbname, login, password):
     return None
 
 def authenticate_and_execute(fn, auth):
-    dbname = odoo.http.request.session.db
-    login = auth.get("login")
-    password = auth.get("password")
-    user = authenticate_user(dbname, login, password)
-    
+    request = odoo.http.request
+    token = auth.get("token") or get_bearer_token(request.httprequest)
+    if token:
+        uid = verify_token(request.env, token)
+        user = request.env(user=uid)["res.users"].browse(uid) if uid else None
+    else:
+        dbname = request.session.db
+        user = authenticate_user(dbname, auth.get("login"), auth.get("password"))
+
+    company_id = auth.get("company_id")
+    if user and company_id:
+        user = company_context(user, company_id)
+
     if user:
-        company_id = auth.get("company_id")
-        if company_id:
-            user.write({'company_id': int(company_id)})
-            user.write({'company_ids': [(4, int(company_id))]})
-        
-        return fn(odoo.http.request, user)
+        return fn(request, user)
     else:
         return {
             "data": None,
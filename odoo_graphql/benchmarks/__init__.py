@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+# Offline benchmarks of the execution pipeline, see README.md
+# They are not loaded with the module: run them with
+#   python -m odoo_graphql.benchmarks
+# Odoo must be importable even without a database: the module imports it.
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import sys
+
+from .runner import (
+    DEFAULT_REPEAT,
+    DEFAULT_TOLERANCE,
+    compare,
+    database_context,
+    fake_context,
+    format_results,
+    metadata,
+    run,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m odoo_graphql.benchmarks",
+        description="Benchmark the GraphQL execution pipeline",
+        epilog="Odoo must be importable, also without --database: only the database and the ORM are replaced.",
+    )
+    parser.add_argument("scenarios", nargs="*", help="Scenarios to run (all by default), e.g. large_list schema")
+    parser.add_argument("-d", "--database", help="Run on this database instead of the in-memory environment")
+    parser.add_argument("--addons-path", help="Addons path of the database")
+    parser.add_argument("--partners", type=int, default=2000, help="Partners of the in-memory environment")
+    parser.add_argument("--models", type=int, default=100, help="Models of the in-memory schema")
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per stage")
+    parser.add_argument("--save", metavar="FILE", help="Save the results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare the results with a baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown before reporting a regression"
+    )
+    args = parser.parse_args(argv)
+
+    if args.database:
+        context = database_context(args.database, addons_path=args.addons_path)
+    else:
+        context = fake_context(partners=args.partners, models=args.models)
+    results = run(context, names=args.scenarios, repeat=args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print(format_results(results, baseline))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"meta": metadata("database" if args.database else "fake"), "results": results}, f, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+
+# In-memory stand-in for the environment and recordsets of Odoo
+# Only the part of the ORM used by the execution pipeline is implemented:
+# search, search_read, read, browse, create and write on dict-based tables.
+# Each of these calls counts as one SQL query.
+import base64
+import operator
+import random
+from collections import namedtuple
+
+Field = namedtuple(
+    "Field",
+    ["name", "type", "comodel_name", "model_name", "store", "compute", "required", "relational", "attachment"],
+)
+
+
+def make_field(model_name, name, type, comodel_name=None, store=True, compute=None, required=False):
+    relational = type in ("many2one", "one2many", "many2many")
+    # Binary values are stored in the table, as base64
+    return Field(name, type, comodel_name, model_name, store, compute, required, relational, False)
+
+
+_OPERATORS = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+_AGGREGATES = {"sum": sum, "min": min, "max": max}
+
+
+def _leaf(leaf, row):
+    name, op, value = leaf
+    if name in (0, 1):  # TRUE_LEAF and FALSE_LEAF
+        return bool(name)
+    current = row.get(name)
+    if isinstance(current, list):  # x2many: any of the ids
+        return any(_leaf(("id", op, value), {"id": i}) for i in current)
+    null = current is None or current is False
+    if op == "=":
+        return null if value is False else current == value
+    if op == "!=":
+        return not null if value is False else current != value
+    if op == "in":
+        return current in value
+    if op == "not in":
+        return current not in value
+    if op in ("like", "ilike"):
+        return not null and str(value).lower() in str(current).lower()
+    if op in _OPERATORS:
+        return not null and _OPERATORS[op](current, value)
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def evaluate_domain(domain, row):
+    stack = []
+    for token in reversed(list(domain)):
+        if token in ("&", "|"):
+            first, second = stack.pop(), stack.pop()
+            stack.append(first and second if token == "&" else first or second)
+        elif token == "!":
+            stack.append(not stack.pop())
+        else:
+            stack.append(_leaf(token, row))
+    return all(stack)
+
+
+class Cursor(object):
+    def __init__(self, dbname="fake"):
+        self.dbname = dbname
+        self.sql_log_count = 0
+
+
+class Database(object):
+    def __init__(self):
+        self.models = {}  # name -> {field name: Field}
+        self.tables = {}  # name -> {id: row}
+
+    def add_model(self, name, fields):
+        self.models[name] = {"id": make_field(name, "id", "integer")}
+        for field in fields:
+            self.models[name][field[0]] = make_field(name, *field)
+        self.tables[name] = {}
+
+
+class Environment(object):
+    def __init__(self, db, cr=None, context=None):
+        self.db = db
+        self.cr = cr or Cursor()
+        self.context = context or {}
+
+    def __getitem__(self, name):
+        return Records(self, name, ())
+
+    def __contains__(self, name):
+        return name in self.db.models
+
+    def invalidate_all(self):
+        pass
+
+
+class Records(object):
+    def __init__(self, env, name, ids):
+        self.env = env
+        self._name = name
+        self._ids = tuple(ids)
+        self._fields = env.db.models[name]
+
+    @property
+    def ids(self):
+        return list(self._ids)
+
+    @property
+    def id(self):
+        return self._ids[0] if self._ids else False
+
+    @property
+    def _table(self):
+        return self.env.db.tables[self._name]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return bool(self._ids)
+
+    def __iter__(self):
+        return (self.browse(i) for i in self._ids)
+
+    def __repr__(self):
+        return f"{self._name}{self._ids}"
+
+    def _query(self):
+        self.env.cr.sql_log_count += 1
+
+    def browse(self, ids):
+        if isinstance(ids, int):
+            ids = [ids]
+        return Records(self.env, self._name, ids)
+
+    def exists(self):
+        return self.browse([i for i in self._ids if i in self._table])
+
+    def filtered_domain(self, domain):
+        return self.browse([i for i in self._ids if evaluate_domain(domain, dict(self._table[i], id=i))])
+
+    def with_company(self, company):
+        return self
+
+    def with_context(self, *args, **kwargs):
+        return self
+
+    def sudo(self, flag=True):
+        return self
+
+    def search(self, domain, offset=0, limit=None, order=None):
+        self._query()
+        table = self._table
+        ids = [i for i in table if evaluate_domain(domain, dict(table[i], id=i))]
+        for term in reversed([term.split() for term in (order or "id").split(",") if term.strip()]):
+            name, reverse = term[0], len(term) > 1 and term[1].lower() == "desc"
+            ids.sort(key=lambda i: (i if name == "id" else table[i].get(name)) or 0, reverse=reverse)
+        ids = ids[offset or 0:]
+        if limit:
+            ids = ids[:limit]
+        return self.browse(ids)
+
+    def search_count(self, domain):
+        return len(self.search(domain))
+
+    def read(self, fields=None, load="_classic_read"):
+        self._query()
+        result = []
+        for record_id in self._ids:
+            row = self._table[record_id]
+            values = {"id": record_id}
+            for name in fields or self._fields:
+                if name == "id":
+                    continue
+                value = row.get(name)
+                field = self._fields[name]
+                if field.type == "many2one":
+                    value = value or False
+                    if value and load:
+                        value = (value, f"{field.comodel_name},{value}")
+                elif field.relational:
+                    value = list(value or ())
+                values[name] = value
+            result.append(values)
+        return result
+
+    def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None, load="_classic_read"):
+        records = self.search(domain or [], offset=offset, limit=limit, order=order)
+        self.env.cr.sql_log_count -= 1  # A single query in Odoo too
+        return records.read(fields, load=load)
+
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        # Only plain groupings and "alias:function(field)" aggregates are supported
+        self._query()
+        groups = {}
+        for record_id, row in self._table.items():
+            if evaluate_domain(domain, dict(row, id=record_id)):
+                groups.setdefault(tuple(row.get(name) for name in groupby), []).append(row)
+        result = []
+        for key, rows in groups.items():
+            values = {"__count": len(rows)}
+            for name, value in zip(groupby, key):
+                if self._fields[name].type == "many2one" and value:
+                    value = (value, f"{self._fields[name].comodel_name},{value}")
+                values[name] = value
+            for spec in fields:
+                if spec == "__count":
+                    continue
+                alias, _, call = spec.partition(":")
+                function, name = call.rstrip(")").split("(")
+                numbers = [row.get(name) or 0 for row in rows]
+                values[alias] = sum(numbers) / len(numbers) if function == "avg" else _AGGREGATES[function](numbers)
+            result.append(values)
+        result = result[offset or 0:]
+        return result[:limit] if limit else result
+
+    def create(self, vals_list):
+        self._query()
+        table = self._table
+        ids = []
+        for vals in [vals_list] if isinstance(vals_list, dict) else vals_list:
+            ids.append(max(table, default=0) + 1)
+            table[ids[-1]] = dict(vals)
+        return self.browse(ids)
+
+    def write(self, vals):
+        self._query()
+        for record_id in self._ids:
+            self._table[record_id].update(vals)
+        return True
+
+
+def make_environment(partners=2000, users=50, companies=3, seed=0):
+    """Return an environment holding a deterministic sample of data
+
+    The models mimic res.company, res.users and res.partner, so that the same
+    queries can be run against a real database.
+    """
+    rng = random.Random(seed)
+    db = Database()
+    db.add_model("res.company", [
+        ("name", "char"),
+        ("partner_id", "many2one", "res.partner"),
+        ("user_ids", "many2many", "res.users"),
+    ])
+    db.add_model("res.users", [
+        ("name", "char"),
+        ("login", "char"),
+        ("active", "boolean"),
+        ("partner_id", "many2one", "res.partner"),
+        ("company_id", "many2one", "res.company"),
+    ])
+    db.add_model("res.partner", [
+        ("name", "char"),
+        ("display_name", "char", None, False, "_compute_display_name"),
+        ("email", "char"),
+        ("phone", "char"),
+        ("street", "char"),
+        ("city", "char"),
+        ("zip", "char"),
+        ("comment", "html"),
+        ("active", "boolean"),
+        ("is_company", "boolean"),
+        ("credit_limit", "float"),
+        ("color", "integer"),
+        ("image_128", "binary"),
+        ("parent_id", "many2one", "res.partner"),
+        ("child_ids", "one2many", "res.partner"),
+        ("user_id", "many2one", "res.users"),
+        ("company_id", "many2one", "res.company"),
+    ])
+    tables = db.tables
+    for i in range(1, companies + 1):
+        tables["res.company"][i] = {"name": f"Company {i}", "partner_id": i, "user_ids": []}
+    for i in range(1, users + 1):
+        company_id = rng.randint(1, companies)
+        tables["res.users"][i] = {
+            "name": f"User {i}",
+            "login": f"user{i}",
+            "active": True,
+            "partner_id": companies + i,
+            "company_id": company_id,
+        }
+        tables["res.company"][company_id]["user_ids"].append(i)
+    for i in range(1, partners + 1):
+        parent_id = rng.randint(1, companies) if i > companies + users else False
+        tables["res.partner"][i] = {
+            "name": f"Partner {i}",
+            "display_name": f"Partner {i}",
+            "email": f"partner{i}@example.com",
+            "phone": f"+32 {rng.randint(100000, 999999)}",
+            "street": f"{rng.randint(1, 200)} Main Street",
+            "city": rng.choice(["Brussels", "Paris", "Berlin", "Madrid"]),
+            "zip": str(rng.randint(1000, 9999)),
+            "comment": "<p>Comment</p>",
+            "active": True,
+            "is_company": i <= companies,
+            "credit_limit": float(rng.randint(0, 10000)),
+            "color": rng.randint(0, 11),
+            "image_128": base64.b64encode(b"\x89PNG" * 64),
+            "parent_id": parent_id,
+            "child_ids": [],
+            "user_id": rng.randint(1, users),
+            "company_id": rng.randint(1, companies),
+        }
+        if parent_id:
+            tables["res.partner"][parent_id]["child_ids"].append(i)
+    return Environment(db)
+
+
+class RecordList(list):
+    """List of records supporting `filtered`, as used by the schema generation"""
+
+    def filtered(self, func):
+        return RecordList(record for record in self if func(record))
+
+
+IrModel = namedtuple("IrModel", ["model", "field_id"])
+IrField = namedtuple("IrField", ["name", "ttype", "relation", "required", "store"])
+IrField.__new__.__defaults__ = (True,)
+
+_FIELD_TYPES = ("char", "text", "integer", "float", "boolean", "date", "datetime", "selection", "monetary", "binary")
+
+
+def make_ir_models(count=300, fields=40, seed=0):
+    """Return ir.model like records for the schema generation"""
+    rng = random.Random(seed)
+    names = [f"x_model.{i}" for i in range(count)]
+    ir_models = []
+    for name in names:
+        ir_fields = [IrField("id", "integer", False, True)]
+        for i in range(fields):
+            ttype = rng.choice(_FIELD_TYPES + ("many2one", "one2many", "many2many"))
+            relation = rng.choice(names) if ttype in ("many2one", "one2many", "many2many") else False
+            ir_fields.append(IrField(f"x_field_{i}", ttype, relation, rng.random() < 0.1))
+        ir_models.append(IrModel(name, RecordList(ir_fields)))
+    return ir_models
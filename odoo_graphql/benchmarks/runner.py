@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+# Measure each stage of the execution pipeline on the benchmark scenarios
+# A stage is timed over `repeat` runs after a warm-up run, its memory peak is
+# measured by a separate run under tracemalloc so that tracing does not
+# distort the timings.
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import graphql
+from graphql import build_schema, introspection_from_schema
+
+from ..cost import CostLimits
+from ..serialization import dumps
+from ..utils import clear_plan_cache, compile_document, get_cost, model2name, parse_definition
+from .fake import make_environment, make_ir_models
+from .scenarios import SCENARIOS
+
+DEFAULT_REPEAT = 20
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure(func, cr, repeat=DEFAULT_REPEAT):
+    """Return the statistics of a stage: timings in ms, peak memory in KiB and SQL queries per run"""
+    func()  # Warm-up
+    timings = []
+    sql_count = cr.sql_log_count
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    sql_queries = (cr.sql_log_count - sql_count) / repeat
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+        "peak_kib": round(peak / 1024, 1),
+        "sql": sql_queries,
+    }
+
+
+def query_stages(scenario, model_mapping, allowed_fields={}):
+    """Return the (stage name, function) of a query scenario"""
+    variables = scenario.variables
+
+    def compile_cold():
+        clear_plan_cache()
+        return compile_document(scenario.query, variables=variables, operation=scenario.operation)
+
+    def compile_cached():
+        return compile_document(scenario.query, variables=variables, operation=scenario.operation)
+
+    definition = compile_cached()
+
+    def cost():
+        # Only the analysis is measured, the scenarios are not rejected
+        return get_cost(definition, model_mapping, variables=variables, cost_limits=CostLimits(max_cost=0))
+
+    def execute():
+        return parse_definition(definition, model_mapping, variables=variables, allowed_fields=allowed_fields)
+
+    data = execute()
+
+    def serialize():
+        return dumps({"data": data})
+
+    return [
+        ("compile", compile_cold),
+        ("compile_cached", compile_cached),
+        ("cost", cost),
+        ("execute", execute),
+        ("serialize", serialize),
+    ]
+
+
+def schema_stages(sdl_func):
+    """Return the (stage name, function) of the schema generation"""
+    sdl = sdl_func()
+    schema = build_schema(sdl)
+    return [
+        ("sdl", sdl_func),
+        ("build", lambda: build_schema(sdl)),
+        ("introspection", lambda: introspection_from_schema(schema)),
+    ]
+
+
+def fake_schema_sdl(ir_models):
+    # The generation methods of the handler only use their arguments
+    from ..models.graphql_handler import GraphQLHandler
+
+    class Handler(object):
+        _schema_field = GraphQLHandler._schema_field
+        _schema = GraphQLHandler._schema
+        _schema_aggregate = GraphQLHandler._schema_aggregate
+        _schema_connection = GraphQLHandler._schema_connection
+        _schema_sync = GraphQLHandler._schema_sync
+        _schema_root = GraphQLHandler._schema_root
+
+    handler = Handler()
+    reverse_mapping = {m.model: model2name(m.model) for m in ir_models}
+
+    def sdl():
+        parts = [handler._schema(m, reverse_mapping, {}) for m in ir_models]
+        parts.append(handler._schema_root(reverse_mapping))
+        return "\n".join(parts)
+
+    return sdl
+
+
+@contextmanager
+def fake_context(partners=2000, models=100):
+    env = make_environment(partners=partners)
+    model_mapping = {model2name(name): env[name] for name in env.db.models}
+    yield env.cr, model_mapping, {}, fake_schema_sdl(make_ir_models(count=models))
+
+
+@contextmanager
+def database_context(dbname, addons_path=None):
+    """Run on a real database, every change is rolled back"""
+    import odoo
+    from odoo import SUPERUSER_ID, api
+    from odoo.modules.registry import Registry
+
+    from ..models.graphql_handler import _model_sdl_cache
+
+    args = ["-d", dbname]
+    if addons_path:
+        args += ["--addons-path", addons_path]
+    odoo.tools.config.parse_config(args)
+    registry = Registry(dbname)
+    cr = registry.cursor()
+    try:
+        handler = api.Environment(cr, SUPERUSER_ID, {})["graphql.handler"]
+
+        def sdl():
+            _model_sdl_cache.clear()
+            return handler.schema()
+
+        yield cr, handler.get_model_mapping(), handler.get_allowed_fields(), sdl
+    finally:
+        cr.rollback()
+        cr.close()
+
+
+def run(context, names=None, repeat=DEFAULT_REPEAT):
+    """Return the results of the scenarios, by scenario and stage"""
+    results = {}
+    with context as (cr, model_mapping, allowed_fields, sdl):
+        for scenario in SCENARIOS:
+            if names and scenario.name not in names:
+                continue
+            stages = query_stages(scenario, model_mapping, allowed_fields)
+            results[scenario.name] = {name: measure(func, cr, repeat) for name, func in stages}
+        if not names or "schema" in names:
+            results["schema"] = {name: measure(func, cr, repeat) for name, func in schema_stages(sdl)}
+    return results
+
+
+def metadata(mode):
+    return {
+        "mode": mode,
+        "python": platform.python_version(),
+        "graphql-core": graphql.__version__,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return the regressions of `results` against a baseline
+
+    A stage regresses when its median time grows by more than `tolerance`
+    or when it issues more SQL queries.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(scenario, {}).get(stage)
+            if previous is None:
+                continue
+            if current["median_ms"] > previous["median_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario}.{stage}: {previous['median_ms']} ms -> {current['median_ms']} ms"
+                )
+            if current["sql"] > previous["sql"]:
+                regressions.append(f"{scenario}.{stage}: {previous['sql']} -> {current['sql']} SQL queries")
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = ["{:<16} {:<16} {:>12} {:>12} {:>10} {:>8} {:>9}".format(
+        "scenario", "stage", "median (ms)", "min (ms)", "peak (KiB)", "SQL", "vs base"
+    )]
+    for scenario, stages in results.items():
+        for stage, current in stages.items():
+            previous = (baseline or {}).get(scenario, {}).get(stage)
+            change = ""
+            if previous and previous["median_ms"]:
+                change = "{:+.0%}".format(current["median_ms"] / previous["median_ms"] - 1)
+            lines.append("{:<16} {:<16} {:>12.3f} {:>12.3f} {:>10.1f} {:>8g} {:>9}".format(
+                scenario, stage, current["median_ms"], current["min_ms"], current["peak_kib"], current["sql"], change
+            ))
+    return "\n".join(lines)
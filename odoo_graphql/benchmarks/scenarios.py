@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Representative queries, written against res.partner, res.users and
+# res.company so that they run on the fake environment as well as on any
+# database where `base` is installed.
+from collections import namedtuple
+
+Scenario = namedtuple("Scenario", ["name", "query", "variables", "operation"])
+Scenario.__new__.__defaults__ = ({}, None)
+
+WIDE_SCALARS = """
+query WideScalars {
+    ResPartner(limit: 200, order: "id") {
+        id name display_name email phone street city zip comment
+        active is_company credit_limit color
+    }
+}
+"""
+
+DEEP_RELATIONS = """
+query DeepRelations {
+    ResPartner(limit: 200, domain: [["parent_id", "!=", false]]) {
+        name
+        child_ids { name email }
+        parent_id {
+            name
+            user_id { name company_id { name } }
+            company_id { name user_ids { login partner_id { name } } }
+        }
+        user_id { name partner_id { name email } company_id { name } }
+    }
+}
+"""
+
+FRAGMENTS = """
+query Fragments {
+    companies: ResPartner(domain: [["is_company", "=", true]]) { ...Partner child_ids { ...Partner } }
+    people: ResPartner(limit: 200, domain: [["is_company", "=", false]]) {
+        ...Partner
+        ... on ResPartner { parent_id { ...Partner } }
+    }
+}
+fragment Partner on ResPartner { id ...Contact ...Address user_id { ...User } }
+fragment Contact on ResPartner { name email phone }
+fragment Address on ResPartner { street city zip }
+fragment User on ResUsers { name login }
+"""
+
+DIRECTIVES = """
+query Directives($withContact: Boolean!, $withoutAddress: Boolean!, $limit: Int) {
+    ResPartner(limit: $limit, order: "name") {
+        name
+        email @include(if: $withContact)
+        phone @include(if: $withContact)
+        street @skip(if: $withoutAddress)
+        city @skip(if: $withoutAddress)
+        user_id @include(if: $withContact) { name }
+        parent_id @skip(if: $withoutAddress) { name city }
+    }
+}
+"""
+
+LARGE_LIST = """
+query LargeList {
+    ResPartner(order: "id") { id name email city credit_limit parent_id { name } }
+}
+"""
+
+MUTATION = """
+mutation Mutation($domain: Domain, $vals: Values) {
+    updated: ResPartner(domain: $domain, vals: $vals) { id name color }
+    created: ResPartner(vals: {name: "Benchmark", email: "benchmark@example.com"}) { id name email }
+}
+"""
+
+CONNECTION = """
+query Connection($after: String) {
+    ResPartnerConnection(first: 100, after: $after, order: "name") {
+        edges { cursor node { name email parent_id { name } } }
+        pageInfo { hasNextPage endCursor }
+    }
+}
+"""
+
+AGGREGATE = """
+query Aggregate {
+    ResPartnerAggregate(groupBy: ["city", "company_id"], domain: [["is_company", "=", false]]) {
+        city company_id { name } count credit_limit_sum credit_limit_avg color_max
+    }
+}
+"""
+
+SCENARIOS = [
+    Scenario("wide_scalars", WIDE_SCALARS),
+    Scenario("deep_relations", DEEP_RELATIONS),
+    Scenario("fragments", FRAGMENTS),
+    Scenario("directives", DIRECTIVES, {"withContact": True, "withoutAddress": False, "limit": 500}),
+    Scenario("large_list", LARGE_LIST),
+    Scenario("mutation", MUTATION, {"domain": [["id", "in", list(range(1, 51))]], "vals": {"color": 3}}),
+    Scenario("connection", CONNECTION),
+    Scenario("aggregate", AGGREGATE),
+]
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+# Delivery of the binary fields
+# Their content is not inlined in the response: selected as a scalar, a
+# binary field gives the URL of its content. Selecting its subfields gives
+# { url signedUrl mimetype size checksum base64 }, where base64 is the only
+# one reading the content and is limited in bytes per response.
+import base64
+import hashlib
+import hmac
+import time
+
+from odoo.exceptions import ValidationError
+from odoo.tools.mimetypes import guess_mimetype
+
+BINARY_ROUTE = "/graphql/binary"
+DEFAULT_MAX_INLINE_BYTES = 1024 * 1024
+SIGNED_URL_LIFETIME = 3600
+METADATA_FIELDS = ("mimetype", "size", "checksum")
+# Served inline by the signed URLs, anything else is downloaded (SVG can hold scripts)
+INLINE_MIMETYPES = frozenset({"image/png", "image/jpeg", "image/gif", "image/webp"})
+
+
+def variant(model, name, size, allowed=None):
+    """Return the field storing the image `name` at `size`, e.g. image_128 for image_1920
+
+    `allowed` is the set of the fields the user can read, all of them if None.
+    """
+    if size and name.startswith("image_"):
+        candidate = f"image_{size}"
+        if candidate in model._fields and (allowed is None or candidate in allowed):
+            return candidate
+    return name
+
+
+def content_url(model_name, record_id, name, size=None):
+    if size:  # Resized on the fly
+        return f"/web/image/{model_name}/{record_id}/{name}/{size}x{size}"
+    return f"/web/content/{model_name}/{record_id}/{name}"
+
+
+def _signature(env, model_name, record_id, name, expires):
+    secret = env["ir.config_parameter"].sudo().get_param("database.secret")
+    message = f"{model_name},{record_id},{name},{expires}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signed_url(env, model_name, record_id, name, lifetime=SIGNED_URL_LIFETIME):
+    """Return a URL giving access to the content without a session until it expires"""
+    expires = int(time.time()) + lifetime
+    token = _signature(env, model_name, record_id, name, expires)
+    return f"{BINARY_ROUTE}/{model_name}/{record_id}/{name}?expires={expires}&token={token}"
+
+
+def check_signature(env, model_name, record_id, name, expires, token):
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time() or not token:
+        return False
+    return hmac.compare_digest(_signature(env, model_name, record_id, name, expires), token)
+
+
+def _flush(records, name):
+    if hasattr(records, "flush_recordset"):
+        records.flush_recordset([name])
+    else:  # Odoo < 16
+        records.flush([name], records)
+
+
+def metadata(records, name):
+    """Return the mimetype, size and checksum known without reading the content of each record, by id
+
+    Contents stored in a column only give their size, the other values are
+    computed from the content when it is read, see `read_contents`.
+    """
+    field = records._fields[name]
+    if field.attachment:  # Known without reading the content
+        rows = records.env["ir.attachment"].sudo().search_read(
+            [("res_model", "=", records._name), ("res_field", "=", name), ("res_id", "in", records.ids)],
+            ["res_id", "mimetype", "file_size", "checksum"],
+        )
+        return {
+            row["res_id"]: {"mimetype": row["mimetype"], "size": row["file_size"], "checksum": row["checksum"]}
+            for row in rows
+        }
+    if not field.store or not records:  # Only known once computed
+        return {}
+    # The column holds the content in base64: 4 characters for 3 bytes, less the padding
+    _flush(records, name)
+    records.env.cr.execute(
+        f'''
+        SELECT id, octet_length("{name}"), substring("{name}" from octet_length("{name}") - 1)
+        FROM "{records._table}" WHERE id IN %s AND "{name}" IS NOT NULL
+        ''',
+        (tuple(records.ids),),
+    )
+    return {
+        record_id: {"size": length // 4 * 3 - bytes(tail).count(b"=")}
+        for record_id, length, tail in records.env.cr.fetchall()
+    }
+
+
+def check_inline(records, name, sizes, loader):
+    """Count the bytes inlined in the response, raise if they exceed its limit"""
+    total = sum(meta.get("size") or 0 for meta in sizes.values())
+    if loader.inline_bytes + total > loader.max_inline_bytes:
+        raise ValidationError(
+            f"Inlining {records._name}.{name} exceeds the limit of {loader.max_inline_bytes} bytes "
+            "per response, select its url instead"
+        )
+    loader.inline_bytes += total
+
+
+def read_contents(records, name, sizes):
+    """Return the base64 content of each record, by id, completing the metadata of the ones read"""
+    result = {}
+    for row in records.read([name]):
+        value = row[name]
+        value = value.decode() if isinstance(value, bytes) else value or None
+        result[row["id"]] = value
+        meta = sizes.setdefault(row["id"], {})
+        if value and "checksum" not in meta:
+            content = base64.b64decode(value)
+            meta.update(mimetype=guess_mimetype(content), size=len(content), checksum=hashlib.sha1(content).hexdigest())
+    return result
+
+
+def resolve_binary(records, field, size, values_by_id, loader, allowed=None):
+    """Set the value of a selected binary field in the values of each record"""
+    name = variant(records, field.name, size, allowed=allowed)
+    resize = size if name == field.name else None
+    key = field.alias or field.name
+    if not field.fields:
+        for record_id, values in values_by_id.items():
+            values[key] = content_url(records._name, record_id, name, resize)
+        return
+
+    binary_field = records._fields[name]
+    selected = {subfield.name for subfield in field.fields}
+    records = records.browse(list(values_by_id))
+    wanted = selected.intersection(METADATA_FIELDS)
+    sizes = metadata(records, name) if wanted or "base64" in selected else {}
+    # Contents stored in a column only give their size without being read
+    unknown = not binary_field.attachment and (not binary_field.store or wanted - {"size"})
+    contents = {}
+    if "base64" in selected and binary_field.store:  # Before reading anything
+        check_inline(records, name, sizes, loader)
+    if "base64" in selected or (wanted and unknown):
+        # Read once, for the content and the metadata not known without it
+        contents = read_contents(records, name, sizes)
+        if "base64" in selected and not binary_field.store:
+            check_inline(records, name, sizes, loader)
+    for record_id, values in values_by_id.items():
+        meta = sizes.get(record_id) or {}
+        binary = {}
+        for subfield in field.fields:
+            if subfield.name == "url":
+                value = content_url(records._name, record_id, name, resize)
+            elif subfield.name == "signedUrl":
+                value = signed_url(records.env, records._name, record_id, name)
+            elif subfield.name == "base64":
+                value = contents.get(record_id)
+            else:
+                value = meta.get(subfield.name)
+            binary[subfield.alias or subfield.name] = value
+        values[key] = binary
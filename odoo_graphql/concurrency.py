@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# Concurrent resolution of the root fields of a query
+# Each root field is resolved by a thread of a bounded pool, with its own
+# read-only cursor: the query takes as long as its slowest root field
+# instead of the sum of all of them. The cursors share the snapshot of the
+# request, so that the root fields see the same data as if read in order.
+import threading
+from contextlib import nullcontext
+
+from odoo import api
+from odoo.modules.registry import Registry
+
+# Number of threads -> pool, shared by the requests of the process
+# Created on first use: threads do not survive the fork of the prefork workers
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(workers):
+    # Only imported by the workers resolving root fields concurrently
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = _executors[workers] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="graphql"
+            )
+        return executor
+
+
+def export_snapshot(cr):
+    """Return the snapshot of the transaction, None if it modified the database
+
+    Other cursors importing the snapshot see the same data as `cr`, but not
+    the changes of its transaction. Both are answered by a single query.
+    """
+    cr.execute("SELECT txid_current_if_assigned() IS NULL, pg_export_snapshot()")
+    unchanged, snapshot = cr.fetchone()
+    return snapshot if unchanged else None
+
+
+def call_with_cursor(env, func, snapshot=None):
+    """Call `func` with an environment like `env` on a new read-only cursor
+
+    With `snapshot`, exported by `export_snapshot`, the cursor sees the data
+    as it was when it was exported, whenever its first query runs.
+    """
+    dbname, uid, context, su = env.cr.dbname, env.uid, dict(env.context), env.su
+
+    def run():
+        threading.current_thread().dbname = dbname  # For the logs
+        with api.Environment.manage() if hasattr(api.Environment, "manage") else nullcontext():
+            with Registry(dbname).cursor() as cr:
+                cr.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                if snapshot:  # Before any other query of the transaction
+                    cr.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+                try:
+                    return func(api.Environment(cr, uid, context, su=su))
+                finally:
+                    cr.rollback()
+
+    return run
+
+
+def resolve_concurrently(env, tasks, workers, snapshot=None):
+    """Return the results of the `tasks`, in order
+
+    Each task is called with its own environment and the first error is
+    raised, as when resolving them one after another. The transaction of
+    `env` must stay open until then for its `snapshot` to be imported.
+    """
+    executor = get_executor(workers)
+    futures = [executor.submit(call_with_cursor(env, task, snapshot)) for task in tasks]
+    return [future.result() for future in futures]
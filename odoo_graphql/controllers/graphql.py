@@ -1,30 +1,37 @@
-from odoo import http
-from odoo.http import request, content_disposition
-import json
-from ..utils import handle_graphql
-from ..auth import authenticate_and_execute
+import odoo
+from odoo import api, http
+from odoo.http import content_disposition
+import base64
+import gzip
+import hashlib
+import time
+from odoo.tools.mimetypes import guess_mimetype
+from ..serialization import dumps, loads
+from ..binary import BINARY_ROUTE, INLINE_MIMETYPES, check_signature
 import logging
 
 _logger = logging.getLogger(__name__)
-_logger.setLevel(logging.INFO)
 
-import json
-from graphql import GraphQLError, GraphQLSchema, execute, parse
+from graphql import GraphQLError
 
-from ..utils import (
-    #convert_odoo_type_to_graphql,
-    retrieve_records,
-    set_default_company,
-    set_user_context,
-)
+from ..utils import compile_document
 import traceback
 
 
+class OperationFailed(Exception):
+    """Roll back the savepoint of an operation of a batch"""
+
+    def __init__(self, result):
+        super().__init__(result["errors"])
+        self.result = result
+
+
 class GraphQLController(http.Controller):
-    @http.route("/graphql", type="http", auth="user", website=True, csrf=False)
+    @http.route("/graphql", type="http", auth="graphql", website=True, csrf=False)
     def graphql(self, **kwargs):
         try:
-            _logger.info(f"Received request: {kwargs}")
+            if http.request.httprequest.method == "GET":  # Read-only, can be cached
+                return self._get_query(kwargs)
 
             # Check Content-Type
             content_type = http.request.httprequest.headers.get("Content-Type", "")
@@ -34,88 +41,183 @@ class GraphQLController(http.Controller):
             # Get request data
             request_data = http.request.httprequest.data.decode("utf-8")
 
-            _logger.info(f"Parsed request data: {request_data}")
-            query = json.loads(request_data).get("query")
-            _logger.info(f"Received query: {query}")
-
-            variables = json.loads(request_data).get("variables", {})
-            operation_name = json.loads(request_data).get("operationName")
-            context = http.request.env.context.copy()
-            _logger.info(f"Context before setting: {context}")
-            set_user_context(context=context, model=http.request.env["product.product"], variables=variables)
-            set_default_company(context, kwargs.get('auth', {}).get('company_id'))
-            _logger.info(f"Context after setting: {context}")
-            schema = GraphQLSchema(query=self.get_query())
-            _logger.info(f"Schema: {schema}")
-            result = execute(
-                schema=schema,
-                context_value=context,
-                document_ast=parse(query),
-                operation_name=operation_name,
-                variable_values=variables,
-                field_resolver=self.get_field_resolver(),
-            )
-            return json.dumps({"data": result.data, "errors": [e.message for e in result.errors]})
+            payload = loads(request_data)
+            if isinstance(payload, list):  # Many operations sent at once
+                return self._json_response(self._execute_batch(payload, isolate=kwargs.get("isolate") in ("1", "true")))
+
+            query, variables, operation_name, company_id = self._prepare(payload)
+            if kwargs.get("stream"):
+                return self._stream_response(query, variables, operation_name, company_id)
+            body = self._encode(query, variables, operation_name, company_id, tracing=self._tracing(payload))[0]
+            return self._json_response(body)
         except Exception as e:
             _logger.error(traceback.format_exc())
-            return json.dumps({"data": None, "errors": [str(e)]})
-
-    def get_query(self):
-        queries = []
-        for model_name in http.request.env:
-            model = http.request.env[model_name]
-            if not model._abstract and hasattr(model, "_graphql"):
-                queries.append(model._graphql)
-        return parse("\n".join(queries))
-
-    def get_field_resolver(self):
-        def resolve(model_name, info, **kwargs):
-            try:
-                model = http.request.env[model_name]
-            except Exception:
-                raise GraphQLError(f"Model {model_name} not found")
-            field = info.field_name
-            variables = info.variable_values
-            ids = kwargs.get("ids")
-            mutation = kwargs.get("mutation", False)
-            company_id = kwargs.get("company_id")  # added parameter to get company_id
-            records = retrieve_records(model, field, variables, ids, mutation, company_id)
-            if not records:
-                raise GraphQLError(f"No {model_name} record found with id(s) {ids}")
-            if isinstance(records, list):
-                return [dict(r.read([field])) for r in records]
-            return dict(records.read([field]))
-
-        return resolve
-
-
-
-
-
-    def get_query(self):
-        queries = []
-        for model_name in http.request.env:
-            model = http.request.env[model_name]
-            if not model._abstract and hasattr(model, "_graphql"):
-                queries.append(model._graphql)
-        return parse("\n".join(queries))
+            return self._json_response({"data": None, "errors": [str(e)]})
+
+    def _get_query(self, params):
+        """Answer a query sent in the query string, with an ETag and a Cache-Control"""
+        payload = {
+            "query": params.get("query"),
+            "operationName": params.get("operationName"),
+            "variables": loads(params["variables"]) if params.get("variables") else {},
+            "extensions": loads(params["extensions"]) if params.get("extensions") else None,
+            "auth": {"company_id": params.get("company_id")},
+        }
+        query, variables, operation_name, company_id = self._prepare(payload)
+        definition = compile_document(query, variables=variables, operation=operation_name)
+        if definition.operation != "query":
+            return http.Response(
+                dumps({"data": None, "errors": ["Only queries can be sent with GET"]}),
+                status=405,
+                headers=[("Content-Type", "application/json"), ("Allow", "POST")],
+            )
 
-    def get_field_resolver(self):
-        def resolve(model_name, info, **kwargs):
+        # A response of the result cache is compared as stored, without running the query
+        body, ok = self._encode(query, variables, operation_name, company_id, tracing=self._tracing(payload))
+        handler = http.request.env["graphql.handler"]
+        etag = hashlib.sha256(body).hexdigest()
+        headers = [
+            ("ETag", f'"{etag}"'),
+            ("Cache-Control", handler.get_cache_control(definition, operation_name) if ok else "no-store"),
+            ("Vary", "Authorization, Cookie"),
+        ]
+        if ok and http.request.httprequest.if_none_match.contains(etag):
+            return http.Response(status=304, headers=headers)
+        headers.append(("Content-Type", "application/json"))
+        return http.request.make_response(body, headers=headers)
+
+    def _json_response(self, value):
+        body = value if isinstance(value, bytes) else dumps(value)
+        return http.request.make_response(body, headers=[("Content-Type", "application/json")])
+
+    def _prepare(self, payload):
+        # The client may only send the hash of a persisted query
+        query = http.request.env["graphql.persisted.query"]._resolve_query(
+            payload.get("query"), payload.get("extensions")
+        )
+
+        variables = payload.get("variables") or {}
+        operation_name = payload.get("operationName")
+        company_id = (payload.get("auth") or {}).get("company_id")
+        return query, variables, operation_name, int(company_id) if company_id else None
+
+    def _tracing(self, payload):
+        return bool((payload.get("extensions") or {}).get("tracing"))
+
+    def _execute(self, query, variables, operation_name, company_id=None, tracing=False):
+        # Executed by graphql.handler: suffixed models, result cache,
+        # concurrent root fields and cached introspection, as for RPC calls
+        return http.request.env["graphql.handler"].handle_graphql(
+            query, variables=variables, operation=operation_name, company_id=company_id, tracing=tracing
+        )
+
+    def _encode(self, query, variables, operation_name, company_id=None, tracing=False):
+        """Return the JSON response to an operation and whether it succeeded
+
+        A response taken from the result cache is sent as it was stored,
+        without decoding it.
+        """
+        response, body = http.request.env["graphql.handler"]._get_response(
+            query, variables, operation_name, company_id, tracing
+        )
+        if response is None:  # Only successful responses are cached
+            return body, True
+        return body or dumps(response), not response.get("errors")
+
+    def _execute_batch(self, payloads, isolate=False):
+        """Execute the operations in order, in the same transaction
+
+        The schema, the access rights and the model mapping are cached, they
+        are only computed for the first operation. Each operation runs in its
+        own savepoint: a failing one is rolled back, and the transaction can
+        still be committed with the operations done before it. Without
+        `isolate`, the operations after it are not executed.
+        """
+        results = []
+        for payload in payloads:
+            if results and results[-1].get("errors") and not isolate:
+                results.append({"data": None, "errors": ["Not executed, a previous operation failed"]})
+                continue
             try:
-                model = http.request.env[model_name]
-            except Exception:
-                raise GraphQLError(f"Model {model_name} not found")
-            field = info.field_name
-            variables = info.variable_values
-            ids = kwargs.get("ids")
-            mutation = kwargs.get("mutation", False)
-            company_id = kwargs.get("company_id")  # added parameter to get company_id
-            records = retrieve_records(model, field, variables, ids, mutation, company_id)
-            if not records:
-                raise GraphQLError(f"No {model_name} record found with id(s) {ids}")
-            if isinstance(records, list):
-                return [dict(r.read([field])) for r in records]
-            return dict(records.read([field]))
-
-        return resolve
+                with http.request.env.cr.savepoint():
+                    result = self._execute(*self._prepare(payload), tracing=self._tracing(payload))
+                    if result.get("errors"):
+                        raise OperationFailed(result)
+            except OperationFailed as e:
+                result = e.result
+            except Exception as e:
+                _logger.error(traceback.format_exc())
+                result = {"data": None, "errors": [str(e)]}
+            results.append(result)
+        return results
+
+    def _stream_response(self, query, variables, operation_name, company_id):
+        # The cursor of the request is closed as soon as the response is
+        # returned: the records are read with a dedicated one while sending it.
+        dbname = http.request.db
+        uid = http.request.env.uid
+        context = dict(http.request.env.context)
+
+        def generate():
+            with odoo.registry(dbname).cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env["graphql.handler"].stream_graphql(
+                    query,
+                    variables=variables,
+                    operation=operation_name,
+                    company_id=company_id,
+                )
+
+        # Without Content-Length, the response is sent with chunked encoding
+        return http.Response(generate(), mimetype="application/json", direct_passthrough=True)
+
+    @http.route("/graphql/schema", type="http", auth="graphql", csrf=False)
+    def graphql_schema(self, format="sdl", **kwargs):
+        kind = "introspection" if format == "json" else "sdl"
+        etag, content = http.request.env["graphql.handler"].get_schema_document(kind)
+        headers = [
+            ("ETag", f'"{etag}"'),
+            ("Cache-Control", "private, no-cache"),
+            ("Vary", "Accept-Encoding"),
+        ]
+        httprequest = http.request.httprequest
+        if httprequest.if_none_match.contains(etag):
+            return http.Response(status=304, headers=headers)
+
+        if kind == "introspection":
+            headers.append(("Content-Type", "application/json"))
+        else:
+            headers.append(("Content-Type", "text/plain; charset=utf-8"))
+            headers.append(("Content-Disposition", content_disposition("schema.graphql")))
+        # The content is stored compressed, only inflate it for clients that need it
+        if "gzip" in httprequest.accept_encodings:
+            headers.append(("Content-Encoding", "gzip"))
+        else:
+            content = gzip.decompress(content)
+        return http.request.make_response(content, headers=headers)
+
+    @http.route(
+        BINARY_ROUTE + "/<string:model>/<int:record_id>/<string:field>", type="http", auth="public", csrf=False
+    )
+    def graphql_binary(self, model, record_id, field, expires=None, token=None, **kwargs):
+        """Serve the content of a binary field to the holder of a signed URL"""
+        env = http.request.env
+        if model not in env or not check_signature(env, model, record_id, field, expires, token):
+            return http.request.not_found()
+        model_field = env[model]._fields.get(field)
+        record = env[model].sudo().browse(record_id).exists()
+        if model_field is None or model_field.type != "binary" or not record or not record[field]:
+            return http.request.not_found()
+        content = base64.b64decode(record[field])
+        mimetype = guess_mimetype(content)
+        headers = [
+            ("Content-Type", mimetype),
+            ("Content-Length", len(content)),
+            ("Cache-Control", f"private, max-age={max(int(expires) - int(time.time()), 0)}"),
+            # Served without a session: the content must never run as a page of the site
+            ("X-Content-Type-Options", "nosniff"),
+            ("Content-Security-Policy", "default-src 'none'"),
+        ]
+        if mimetype not in INLINE_MIMETYPES:
+            headers.append(("Content-Disposition", "attachment"))
+        return http.request.make_response(content, headers=headers)
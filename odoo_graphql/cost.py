@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+# Static analysis of the cost of a query, computed on its plan before any
+# record is read: each selected field costs its weight multiplied by the
+# number of records it is expected to be read for.
+from collections import namedtuple
+
+from odoo.exceptions import ValidationError
+
+from .aggregate import AGGREGATE_SUFFIX
+from .binary import DEFAULT_MAX_INLINE_BYTES
+from .pagination import CONNECTION_SUFFIX, DEFAULT_PAGE_SIZE, connection_nodes
+from .sync import SYNC_SUFFIX, sync_records
+
+DEFAULT_MAX_COST = 1000000
+# Streamed responses are meant for large exports and have their own budget
+DEFAULT_STREAM_MAX_COST = 10 * DEFAULT_MAX_COST
+DEFAULT_MAX_DEPTH = 10
+# Number of records expected when the query does not give any limit: as
+# many as a root field may return, unless `list_sizes` knows better
+DEFAULT_MAX_LIST_SIZE = 10000
+DEFAULT_X2MANY_SIZE = 10
+COMPUTED_WEIGHT = 5
+BINARY_WEIGHT = 10
+COUNT_WEIGHT = 10
+
+# `list_sizes` by model and `field_weights` by "model.field" override the defaults
+# `max_inline_bytes` limits the binary content inlined in a response
+# `max_list_size` is the size of the root fields read without any limit
+CostLimits = namedtuple(
+    "CostLimits", ["max_cost", "max_depth", "list_sizes", "field_weights", "max_inline_bytes", "max_list_size"]
+)
+CostLimits.__new__.__defaults__ = (
+    DEFAULT_MAX_COST, DEFAULT_MAX_DEPTH, {}, {}, DEFAULT_MAX_INLINE_BYTES, DEFAULT_MAX_LIST_SIZE
+)
+
+
+def field_weight(model_field, limits):
+    weight = limits.field_weights.get(f"{model_field.model_name}.{model_field.name}")
+    if weight is not None:
+        return weight
+    if model_field.type == "binary":
+        return BINARY_WEIGHT
+    if model_field.compute and not model_field.store:
+        return COMPUTED_WEIGHT
+    return 1
+
+
+def list_size(model, arguments, limits, default=None):
+    """Return the number of records a root field is expected to read
+
+    `default` is the size applied by the root field itself without any
+    limit, e.g. the page size of a connection.
+    """
+    ids = arguments.get("ids")
+    if ids is not None:  # Read whatever the limit
+        return len(ids) if isinstance(ids, list) else 1
+    for name in ("limit", "first", "last"):
+        if arguments.get(name) is not None:
+            size = int(arguments[name])
+            if size < 0:  # Would lower the cost of the query
+                raise ValidationError(f"Invalid {name}: {size}")
+            if size or name != "limit":  # `search` reads every record with a limit of 0
+                return size
+    if default is not None:
+        return default
+    return limits.list_sizes.get(model._name, limits.max_list_size)
+
+
+def fields_cost(model, fields, multiplier, limits, depth=1):
+    """Return the (cost, depth) of reading `fields` on `multiplier` records"""
+    cost = 0
+    max_depth = depth
+    for field in fields:
+        model_field = model._fields.get(field.name)
+        if model_field is None:
+            continue
+        cost += multiplier * field_weight(model_field, limits)
+        if model_field.relational and field.fields:
+            size = 1
+            if model_field.type != "many2one":
+                size = limits.list_sizes.get(model_field.comodel_name, DEFAULT_X2MANY_SIZE)
+            sub_cost, sub_depth = fields_cost(
+                model.env[model_field.comodel_name], field.fields, multiplier * size, limits, depth + 1
+            )
+            cost += sub_cost
+            max_depth = max(max_depth, sub_depth)
+    return cost, max_depth
+
+
+def connection_cost(model, fields, multiplier, limits):
+    cost, depth = fields_cost(model, connection_nodes(fields), multiplier, limits)
+    if any(field.name == "totalCount" for field in fields):
+        cost += COUNT_WEIGHT
+    return cost, depth
+
+
+def aggregate_cost(model, fields, multiplier, limits):
+    # Each group costs its grouped fields and its aggregates
+    cost, depth = fields_cost(model, fields, multiplier, limits)
+    cost += multiplier * sum(1 for field in fields if field.name not in model._fields)
+    return cost, depth
+
+
+def analyze_cost(definition, model_mapping, arguments, limits):
+    """Return the estimated (cost, depth) of a plan
+
+    `arguments` are the values of the arguments of each root field.
+    """
+    cost = 0
+    max_depth = 0
+    for field, field_arguments in zip(definition.fields, arguments):
+        model = model_mapping.get(field.name)
+        connection = model is None and field.name.endswith(CONNECTION_SUFFIX)
+        aggregate = model is None and field.name.endswith(AGGREGATE_SUFFIX)
+        sync = model is None and field.name.endswith(SYNC_SUFFIX)
+        if connection:
+            model = model_mapping.get(field.name[:-len(CONNECTION_SUFFIX)])
+        elif aggregate:
+            model = model_mapping.get(field.name[:-len(AGGREGATE_SUFFIX)])
+        elif sync:
+            model = model_mapping.get(field.name[:-len(SYNC_SUFFIX)])
+        if model is None:
+            continue
+        size = list_size(model, field_arguments, limits, default=DEFAULT_PAGE_SIZE if connection else None)
+        creation = field_arguments.get("domain") is None and not field_arguments.get("ids")
+        if definition.operation == "mutation" and creation:
+            vals = field_arguments.get("vals")
+            size = len(vals) if isinstance(vals, list) else 1  # Creation or upsert
+        if connection:
+            field_cost, depth = connection_cost(model, field.fields, size, limits)
+        elif aggregate:
+            field_cost, depth = aggregate_cost(model, field.fields, size, limits)
+        elif sync:
+            field_cost, depth = fields_cost(model, sync_records(field.fields), size, limits)
+        else:
+            field_cost, depth = fields_cost(model, field.fields, size, limits)
+        cost += field_cost
+        max_depth = max(max_depth, depth)
+    return cost, max_depth
+
+
+def check_cost(definition, model_mapping, arguments, limits):
+    """Return the cost of a plan, raise if it exceeds the limits"""
+    cost, depth = analyze_cost(definition, model_mapping, arguments, limits)
+    if limits.max_depth and depth > limits.max_depth:
+        raise ValidationError(f"Query is too deep: {depth} levels, maximum is {limits.max_depth}")
+    if limits.max_cost and cost > limits.max_cost:
+        raise ValidationError(f"Query is too expensive: cost {cost}, maximum is {limits.max_cost}")
+    return {"requested": cost, "maximum": limits.max_cost, "depth": depth}
@@ -1,3 +1,9 @@
 # -*- coding: utf-8 -*-
 
-from . import graphql_handler
\ No newline at end of file
+from . import graphql_change_log
+from . import graphql_handler
+from . import graphql_persisted_query
+from . import graphql_unlink_log
+from . import base
+from . import ir_http
+from . import res_users_apikeys
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from functools import partial
+
+from odoo import api, models
+
+from .graphql_handler import CHANGED_MODELS_KEY, invalidate_results
+
+
+class Base(models.AbstractModel):
+    _inherit = "base"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._graphql_changed()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._graphql_changed()
+        return res
+
+    def unlink(self):
+        self._graphql_changed()
+        if self._name in self.env["graphql.handler"].get_sync_models():
+            # Sent to the clients synchronizing this model, see sync.py
+            self.env["graphql.unlink.log"].sudo()._record(self._name, self.ids)
+        return super().unlink()
+
+    def _graphql_changed(self):
+        """Drop the GraphQL results cached from this model once the transaction is committed"""
+        if self._transient or self._name == "graphql.change.log":
+            return
+        if not self.env["graphql.handler"].get_result_cache_settings()[0]:
+            return
+        cr = self.env.cr
+        if not hasattr(cr, "precommit"):  # Odoo < 15
+            self.env["graphql.change.log"].sudo()._record({self._name})
+            invalidate_results(cr.dbname, {self._name})
+            return
+        changed = cr.precommit.data.get(CHANGED_MODELS_KEY)
+        if changed is None:
+            changed = cr.precommit.data[CHANGED_MODELS_KEY] = set()
+            # Logged once per transaction, for the other workers
+            cr.precommit.add(partial(self.env["graphql.change.log"].sudo()._record, changed))
+            cr.postcommit.add(partial(invalidate_results, cr.dbname, changed))
+        changed.add(self._name)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# Changes kept in the log, long enough for every worker to have polled them
+RETENTION = timedelta(days=1)
+# Ids of the rows that may still be committed after a higher id was read
+OVERLAP = 1000
+
+
+class GraphQLChangeLog(models.Model):
+    """Models modified by each transaction
+
+    Each worker polls this log to drop the results it cached from modified
+    models, see `graphql.handler._sync_result_cache`. Rows are inserted
+    right before the commit, once per transaction and model.
+    """
+    _name = "graphql.change.log"
+    _description = "GraphQL Change Log"
+    _log_access = False
+    _order = "id desc"
+
+    model = fields.Char(required=True, index=True, readonly=True)
+    date = fields.Datetime(required=True, readonly=True)
+
+    @api.model
+    def _record(self, names):
+        if not names:
+            return
+        self.env.cr.execute(
+            """
+            INSERT INTO graphql_change_log (model, date)
+            SELECT unnest(%s), now() at time zone 'UTC'
+            """,
+            (sorted(names),),
+        )
+
+    @api.model
+    def _changes(self, last_id, gaps=()):
+        """Return the (last id, missing ids, modified models) since `last_id`
+
+        Rows with a lower id can be committed after a higher one: the ids
+        missing below the last one (`gaps`) are looked up again by the next
+        calls, until OVERLAP higher ids are read.
+        """
+        self.env.cr.execute(
+            "SELECT id, model FROM graphql_change_log WHERE id > %s OR id = ANY(%s)", (last_id, list(gaps))
+        )
+        rows = self.env.cr.fetchall()
+        ids = {row_id for row_id, model in rows}
+        new_last_id = max([last_id] + list(ids))
+        skipped = range(max(last_id, new_last_id - OVERLAP) + 1, new_last_id)
+        gaps = frozenset(i for i in set(gaps).union(skipped) - ids if i > new_last_id - OVERLAP)
+        return new_last_id, gaps, {model for row_id, model in rows}
+
+    @api.model
+    def _last_id(self):
+        self.env.cr.execute("SELECT coalesce(max(id), 0) FROM graphql_change_log")
+        return self.env.cr.fetchone()[0]
+
+    @api.autovacuum
+    def _gc_change_log(self):
+        self.env.cr.execute(
+            "DELETE FROM graphql_change_log WHERE date < %s", (fields.Datetime.now() - RETENTION,)
+        )
@@ -1,37 +1,97 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, tools
-from ..utils import handle_graphql, model2name
+from odoo import SUPERUSER_ID, models, tools
+from odoo.exceptions import AccessDenied
+from graphql import build_ast_schema, build_schema, get_introspection_query, graphql_sync
+from ..aggregate import AGGREGATE_FUNCTIONS, AGGREGATE_SUFFIX, NUMERIC_TYPES, UNGROUPABLE_TYPES
+from ..auth import company_context, verify_token
+from ..binary import DEFAULT_MAX_INLINE_BYTES
+from ..cache import LRUCache, ResultCache
+from ..cost import DEFAULT_MAX_COST, DEFAULT_MAX_DEPTH, DEFAULT_MAX_LIST_SIZE, DEFAULT_STREAM_MAX_COST, CostLimits
+from ..serialization import dumps, loads
+from ..sync import SYNC_SUFFIX
+from ..tracing import Tracer
+from .graphql_change_log import OVERLAP
+from ..utils import (
+    STREAM_CHUNK_SIZE,
+    ModelMapping,
+    compile_document,
+    get_document,
+    get_document_key,
+    get_models,
+    handle_graphql,
+    is_introspection,
+    model2name,
+    plan_cache_stats,
+    stream_graphql,
+)
+from collections import namedtuple
+import gzip
+import hashlib
 import json
+import os
+import random
+import time
 #from odoo.addons.base.models.res_partner import res_partner
 import logging
 
 _logger = logging.getLogger(__name__)
-_logger.setLevel(logging.INFO)
 
+# (dbname, model, fields version, groups, allowed fields, model names) -> type definition
+# It outlives the registry reloads so that only the changed models are regenerated
+_model_sdl_cache = LRUCache(4096)
+
+# Responses of the read-only queries, see handle_graphql
+_result_cache = ResultCache()
+# dbname -> (last id, ids missing below it) of graphql.change.log
+_change_log_state = {}
+DEFAULT_RESULT_TTL = 60
+# Models modified by the current transaction, in the precommit data of the cursor
+CHANGED_MODELS_KEY = "graphql.changed_models"
+
+# dbname -> timings of the warm-up done when loading the registry, see _warmup
+_warmup_stats = {}
+# Sent as is by GraphiQL and the codegen tools, answered from the schema cache
+INTROSPECTION_QUERY = get_introspection_query()
+DEFAULT_WARMUP_SIGNATURES = 5
+
+
+def invalidate_results(dbname, names):
+    _result_cache.invalidate([(dbname, name) for name in names])
+
+
+ModelAccess = namedtuple("ModelAccess", ["read", "write", "create", "unlink"])
+AccessMatrix = namedtuple("AccessMatrix", ["models", "fields"])
 
 class GraphQLHandler(models.TransientModel):    
     _name = "graphql.handler"
 
     def handle_query(self, query):
-        _logger.info(f"Parsed query: {query}")  # Add this line for debugging
         if isinstance(query, bytes):
             query = query.decode()
         variables = {}
         operation = None
+        extensions = None
         company_id = None # initialize company_id variable
         try:  # Usual format is json with "query" and "variables" entries
             data = json.loads(query)
-            query = data["query"]
+            query = data.get("query")
             variables = data.get("variables", {})
             operation = data.get("operationName")
+            extensions = data.get("extensions")
             # An error when authenticating must be sent back
             try:
                 auth = data.get("auth", {})
                 if auth:
                     login = auth.get("login")
                     password = auth.get("password")
-                    if login and password:
+                    token = auth.get("token")
+                    if token:  # API key, verified once per TOKEN_CACHE_TTL
+                        uid = verify_token(self.env, token)
+                        if not uid:
+                            raise AccessDenied()
+                        self = self.with_user(uid)
+                    elif login and password:
                         uid = self.env["res.users"].authenticate(
                             self.env.cr.dbname,
                             login, password,
@@ -46,11 +106,19 @@ class GraphQLHandler(models.TransientModel):
         except Exception:  # We may have pure graphql query
             pass
 
+        try:  # The client may only send the hash of a persisted query
+            query = self.env["graphql.persisted.query"]._resolve_query(query, extensions)
+        except Exception as e:
+            return {
+                "errors": {"message": str(e)}
+            }
+
         response = self.handle_graphql(
             query,
             variables=variables,
             operation=operation,
             company_id=company_id,  # pass company_id to handle_graphql function
+            tracing=bool((extensions or {}).get("tracing")),
         )
         return response
 
@@ -63,16 +131,21 @@ class GraphQLHandler(models.TransientModel):
         operation=None,
         company_id=None,  # add company_id parameter
         allowed_fields={},
+        tracing=False,
     ):
-        _logger.info(company_id)
-        return handle_graphql(
+        tracer = self.get_tracer(requested=tracing)
+        response = handle_graphql(
             query,
             model_mapping,
             variables=variables,
             operation=operation,
             company_id=company_id,
             allowed_fields=allowed_fields,
+            cost_limits=self.get_cost_limits(),
+            tracer=tracer,
+            workers=self.get_parallel_workers(),
         )
+        return self.finish_trace(tracer, response, operation)
 
     def handle_graphql(
         self,
@@ -80,17 +153,43 @@ class GraphQLHandler(models.TransientModel):
         variables={},
         operation=None,
         company_id=None,
+        tracing=False,
     ):
-        _logger.info(company_id)
+        response, body = self._get_response(query, variables, operation, company_id, tracing)
+        return loads(body) if response is None else response
+
+    def _get_response(self, query, variables={}, operation=None, company_id=None, tracing=False):
+        # (response, its encoding), the response is None when it comes from the result cache
+        if is_introspection(query, variables, operation):
+            if get_document_key(query) == get_document_key(INTROSPECTION_QUERY):
+                etag, content = self.get_schema_document("introspection")
+                return None, gzip.decompress(content)
+            # Other clients ask for less or more
+            result = graphql_sync(
+                self.get_introspection_schema(), query, variable_values=variables, operation_name=operation
+            )
+            response = {"data": result.data}
+            if result.errors:
+                response["errors"] = {"message": "\n".join(error.message for error in result.errors)}
+            return response, None
+
         model_mapping = self.get_model_mapping()
         allowed_fields = self.get_allowed_fields()
         extra_variables = self.get_extra_variables()
         variables = {**extra_variables, **variables}
 
-        if company_id:  # set current company if company_id is provided
-            company = self.env["res.company"].browse(company_id)
-            if company.exists():
-                self = self.with_company(company)       
+        if company_id:
+            self = self._with_company(company_id)
+            if self is None:
+                return {"data": None, "errors": {"message": f"Company {company_id} is not allowed"}}, None
+
+        entry = None
+        if not tracing and self.get_result_cache_settings()[0]:
+            entry = self._result_cache_entry(query, variables, operation, model_mapping)
+        if entry is not None:
+            cached = self._get_cached_result(entry[0])
+            if cached is not None:
+                return None, cached
 
         response = self._handle_graphql(
             query,
@@ -99,66 +198,280 @@ class GraphQLHandler(models.TransientModel):
             operation=operation,
             company_id=company_id,  # pass company_id to _handle_graphql function
             allowed_fields=allowed_fields,
+            tracing=tracing,
         )
-        return response
+        if entry is not None and not response.get("errors"):
+            body = dumps(response)
+            _result_cache.set(entry[0], body, entry[1])
+            return response, body
+        return response, None
 
-    # @tools.ormcache()  # Unable to use a closed cursor, we can not cache cursor and thus models
-    def get_model_mapping(self):
-        allowed = set(self._get_allowed_models())
-        return {
-            model2name(name): model
-            for name, model in self.env.items()
-            if name in allowed
-        }
+    def _with_company(self, company_id):
+        """Return the handler working in `company_id`, None if the user does not belong to it"""
+        user = company_context(self.env.user, company_id)
+        return None if user is None else self.with_env(user.env)
 
     @tools.ormcache()
-    def _get_allowed_models(self, mode="read"):
-
-        ir_model_ids = (
-            self.sudo()
-            .env["ir.model"]
-            .search(
-                [
-                    ("transient", "=", False),
-                ]
-            )
+    def get_result_cache_settings(self):
+        # (budget in bytes, time to live in seconds), the cache is disabled without budget
+        get_param = self.env["ir.config_parameter"].sudo().get_param
+        return (
+            int(get_param("graphql.result_cache_size", 0)),
+            int(get_param("graphql.result_cache_ttl", DEFAULT_RESULT_TTL)),
         )
 
-        ir_model_ids = ir_model_ids.filtered(lambda m: m.model in self.env)
-
-        # Check if access exists that allow the user to get informations
-        model_access = self.env["ir.model.access"]
-        model_by_rights = ir_model_ids.filtered(
-            lambda m: model_access.check(m.model, mode=mode, raise_exception=False)
+    @tools.ormcache()
+    def get_cache_control_settings(self):
+        # Operation or model name -> max-age in seconds of its responses to GET requests
+        return json.loads(self.env["ir.config_parameter"].sudo().get_param("graphql.cache_control", "{}"))
+
+    def get_cache_control(self, definition, operation=None):
+        """Return the Cache-Control header of the response to a query
+
+        The max-age of the operation is used if it is configured, otherwise
+        the smallest of the models it reads. Without max-age, clients and
+        proxies must revalidate the response with its ETag.
+        """
+        settings = self.get_cache_control_settings()
+        max_age = settings.get(operation) if operation else None
+        if max_age is None:
+            ages = [settings.get(name) for name in get_models(definition, self.get_model_mapping())]
+            max_age = min(ages) if ages and None not in ages else 0
+        if not max_age:
+            return "private, no-cache"
+        # Only the responses to the public user can be shared by the proxies
+        scope = "public" if self.env.user._is_public() else "private"
+        return f"{scope}, max-age={int(max_age)}"
+
+    def _result_cache_entry(self, query, variables, operation, model_mapping):
+        """Return the (key, tags) of the result of a query, None if it can not be cached"""
+        if not isinstance(query, str):
+            return None
+        try:
+            definition = compile_document(query, variables=variables, operation=operation)
+        except Exception:
+            return None  # Reported when executing it
+        if definition.operation != "query":
+            return None
+        dbname = self.env.cr.dbname
+        key = (
+            dbname,
+            get_document_key(query),
+            operation,
+            json.dumps(variables, sort_keys=True, default=str),
+            self.env.uid,
+            self._get_groups_signature(),
+            tuple(self.env.companies.ids),
+            self.env.context.get("lang"),
+        )
+        return key, [(dbname, name) for name in get_models(definition, model_mapping)]
+
+    def _get_cached_result(self, key):
+        precommit = getattr(self.env.cr, "precommit", None)
+        if precommit is not None and precommit.data.get(CHANGED_MODELS_KEY):
+            return None  # The cached results do not see the changes of this transaction
+        _result_cache.configure(*self.get_result_cache_settings())
+        self._sync_result_cache()
+        return _result_cache.get(key)
+
+    def _sync_result_cache(self):
+        """Drop the results cached from the models modified by any worker"""
+        log = self.env["graphql.change.log"].sudo()
+        dbname = self.env.cr.dbname
+        if dbname in _change_log_state:
+            last_id, gaps, names = log._changes(*_change_log_state[dbname])
+        else:  # Nothing was cached by this worker yet, only the ids still missing matter
+            last_id, gaps, names = log._changes(max(log._last_id() - OVERLAP, 0))
+            names = ()
+        _change_log_state[dbname] = (last_id, gaps)
+        if names:
+            invalidate_results(dbname, names)
+
+    def get_cache_stats(self):
+        warmup = _warmup_stats.get(self.env.cr.dbname)
+        if warmup is not None:  # Inherited when computed by the parent of the prefork workers
+            warmup = dict(warmup, inherited=warmup["pid"] != os.getpid())
+        return dict(plan_cache_stats(), results=_result_cache.stats(), warmup=warmup)
+
+    def stream_graphql(
+        self,
+        query,
+        variables={},
+        operation=None,
+        company_id=None,
+    ):
+        """Same as handle_graphql, but generate the JSON response in pieces"""
+        if company_id:
+            self = self._with_company(company_id)
+            if self is None:
+                yield dumps({"data": None, "errors": {"message": f"Company {company_id} is not allowed"}})
+                return
+        variables = {**self.get_extra_variables(), **variables}
+        chunk_size = int(
+            self.env["ir.config_parameter"].sudo().get_param("graphql.stream_chunk_size", STREAM_CHUNK_SIZE)
         )
+        for piece in stream_graphql(
+            query,
+            self.get_model_mapping(),
+            variables=variables,
+            operation=operation,
+            allowed_fields=self.get_allowed_fields(),
+            company_id=company_id,
+            chunk_size=chunk_size,
+            cost_limits=self.get_stream_cost_limits(),
+        ):
+            yield piece
 
-        # Check if rules exists that may allow the user to get informations
-        # E.g. Public user can access some products
-        ir_rule = self.env["ir.rule"]
-        model_by_rules = ir_model_ids.filtered(
-            lambda m: ir_rule._get_rules(m.model, mode=mode)
+    @tools.ormcache()
+    def get_cost_limits(self):
+        # Cleared by Odoo whenever a system parameter is modified
+        get_param = self.env["ir.config_parameter"].sudo().get_param
+        return CostLimits(
+            max_cost=int(get_param("graphql.max_cost", DEFAULT_MAX_COST)),
+            max_depth=int(get_param("graphql.max_depth", DEFAULT_MAX_DEPTH)),
+            list_sizes=json.loads(get_param("graphql.cost.list_sizes", "{}")),
+            field_weights=json.loads(get_param("graphql.cost.field_weights", "{}")),
+            max_inline_bytes=int(get_param("graphql.max_inline_bytes", DEFAULT_MAX_INLINE_BYTES)),
+            max_list_size=int(get_param("graphql.cost.max_list_size", DEFAULT_MAX_LIST_SIZE)),
         )
 
-        model_access = model_by_rights | model_by_rules
+    @tools.ormcache()
+    def get_stream_cost_limits(self):
+        # Same limits, with the budget of the streamed responses
+        max_cost = self.env["ir.config_parameter"].sudo().get_param("graphql.stream_max_cost", DEFAULT_STREAM_MAX_COST)
+        return self.get_cost_limits()._replace(max_cost=int(max_cost))
+
+    @tools.ormcache()
+    def get_parallel_workers(self):
+        # Threads resolving the root fields of a query concurrently, 0 to resolve them in order
+        return int(self.env["ir.config_parameter"].sudo().get_param("graphql.parallel_workers", 0))
+
+    @tools.ormcache()
+    def get_sync_models(self):
+        # Models whose deletions are logged for the delta synchronization, see sync.py
+        sync_models = self.env["ir.config_parameter"].sudo().get_param("graphql.sync_models", "")
+        return frozenset(name.strip() for name in sync_models.split(",") if name.strip())
 
-        return ir_model_ids.mapped("model")
+    @tools.ormcache()
+    def get_tracing_sample_rate(self):
+        # Share of the requests traced to the log, between 0 and 1
+        return float(self.env["ir.config_parameter"].sudo().get_param("graphql.tracing_sample_rate", 0))
+
+    def get_tracer(self, requested=False):
+        """Return a tracer if the client asked for one or the request is sampled"""
+        sampled = random.random() < self.get_tracing_sample_rate()
+        if requested or sampled:
+            return Tracer(self.env.cr, requested=requested, sampled=sampled)
+        return None
+
+    def finish_trace(self, tracer, response, operation=None):
+        """Log the trace of a sampled request, keep it only if it was requested"""
+        if tracer is None:
+            return response
+        trace = tracer.result()
+        if tracer.sampled:
+            _logger.info("GraphQL trace of %s: %s", operation or "anonymous operation", json.dumps(trace))
+        if tracer.requested:
+            response.setdefault("extensions", {})["tracing"] = trace
+        return response
+
+    def get_model_mapping(self):
+        # Models are only instantiated when the query uses them
+        return ModelMapping(self.env, self._get_model_names())
+
+    def _get_model_names(self, mode="read"):
+        return self._get_model_names_cached(self._get_groups_signature(), self.env.su, mode)
+
+    @tools.ormcache("groups", "su", "mode")
+    def _get_model_names_cached(self, groups, su, mode):
+        return {model2name(name): name for name in self._get_allowed_models(mode)}
+
+    def get_access_matrix(self):
+        """Return the access matrix of the current user
+
+        It gives for each model its rights (read, write, create and unlink)
+        and, for the models having fields restricted by groups, the frozenset
+        of the fields the user may read. It is computed once per combination
+        of groups and the ormcache is cleared by Odoo on any change of the
+        access rights, rules or groups.
+        """
+        return self._get_access_matrix(self._get_groups_signature(), self.env.su)
+
+    @tools.ormcache("groups", "su")
+    def _get_access_matrix(self, groups, su):
+        # Rules only restrict the records of the models granted by the
+        # access rights, they can not grant access to another model.
+        self.env.cr.execute("""
+            SELECT m.model,
+                   coalesce(bool_or(a.perm_read), false),
+                   coalesce(bool_or(a.perm_write), false),
+                   coalesce(bool_or(a.perm_create), false),
+                   coalesce(bool_or(a.perm_unlink), false)
+            FROM ir_model m
+            LEFT JOIN ir_model_access a
+                ON a.model_id = m.id
+                AND a.active
+                AND (a.group_id IS NULL OR a.group_id = ANY(%s))
+            WHERE NOT m.transient
+            GROUP BY m.model
+        """, [list(groups)])
+        rights = {}
+        for model, *perms in self.env.cr.fetchall():
+            if model not in self.env.registry or self.env.registry[model]._abstract:
+                continue
+            rights[model] = ModelAccess(*perms) if not su else ModelAccess(True, True, True, True)
+
+        fields = {}
+        group_results = {}
+        for model, access in rights.items():
+            if not access.read:
+                continue
+            model_fields = self.env.registry[model]._fields
+            if not any(f.groups for f in model_fields.values()):
+                continue
+            allowed = set()
+            for name, field in model_fields.items():
+                if field.groups and not su:
+                    if field.groups not in group_results:
+                        group_results[field.groups] = self._has_groups(field.groups)
+                    if not group_results[field.groups]:
+                        continue
+                allowed.add(name)
+            fields[model] = frozenset(allowed)
+        return AccessMatrix(rights, fields)
+
+    def _has_groups(self, groups):
+        # Same as user_has_groups, without depending on the debug mode:
+        # none of the negated groups, and one of the others if there are any
+        positive = None
+        for xmlid in groups.split(","):
+            xmlid = xmlid.strip()
+            if xmlid.startswith("!"):
+                if self.env.user.has_group(xmlid[1:]):
+                    return False
+            elif not positive:
+                positive = self.env.user.has_group(xmlid)
+        return positive is not False
+
+    def _get_allowed_models(self, mode="read"):
+        rights = self.get_access_matrix().models
+        return sorted(model for model, access in rights.items() if getattr(access, mode))
 
     def get_allowed_models(self, mode="read"):
         ir_model_ids = (
             self.sudo()
             .env["ir.model"]
-            .search([("model", "in", self._get_allowed_models())])
+            .search([("model", "in", self._get_allowed_models(mode))])
         )
         return ir_model_ids
 
-    @tools.ormcache()
     def get_allowed_fields(self):
         # Return a dictionnary containing for each model
         # a list of fields allowed for the current user
         # None allows all fields,
         # Empty list allows no field.
         # e.g.: {"helpdesk.ticket": []}
-        return {}
+        return self.get_access_matrix().fields
 
     def get_extra_variables(self):
         return self.env.context
@@ -181,57 +494,307 @@ class GraphQLHandler(models.TransientModel):
             ttype = "Boolean"
         elif ttype in ("selection",):
             ttype = "[String]"
+        elif ttype in ("binary",):
+            ttype = "Binary"
         else:
             ttype = "String"
 
         if ir_field.required:
             ttype += "!"
 
-        res = "{name}: {ttype}".format(
+        res = "{name}{args}: {ttype}".format(
             name=ir_field.name,
+            args="(size: Int)" if ir_field.ttype == "binary" else "",
             ttype=ttype,
         )
         return res
 
     def _schema(self, ir_model, reverse_mapping, allowed_fields):
         name = reverse_mapping.get(ir_model.model)
-        res = "type {name} {{\n".format(name=name)
 
         fields = ir_model.field_id
         allowed_fields = allowed_fields.get(ir_model.model)
         if allowed_fields is not None:
-            fields.filtered(lambda f: f in allowed_fields)
-
-        for f in fields:
-            res += "    " + self._schema_field(f, reverse_mapping) + "\n"
+            fields = fields.filtered(lambda f: f.name in allowed_fields)
+        if not fields:  # A type without fields is not valid
+            return ""
+
+        lines = ["type {name} {{".format(name=name)]
+        lines.extend("    " + self._schema_field(f, reverse_mapping) for f in fields)
+        lines.append("}\n")
+        lines.append(self._schema_aggregate(name, fields, reverse_mapping))
+        return "\n".join(lines)
+
+    def _schema_aggregate(self, name, ir_fields, reverse_mapping):
+        # A group has its grouped fields, its number of records and the aggregates of the numeric fields
+        lines = ["type {name}{suffix} {{".format(name=name, suffix=AGGREGATE_SUFFIX), "    count: Int"]
+        for f in ir_fields:
+            if not f.store or f.name == "id":
+                continue
+            if f.ttype not in UNGROUPABLE_TYPES:  # Any value can be null in a group
+                lines.append("    " + self._schema_field(f, reverse_mapping).rstrip("!"))
+            if f.ttype in NUMERIC_TYPES:
+                lines.extend(
+                    "    {name}_{function}: Float".format(name=f.name, function=function)
+                    for function in AGGREGATE_FUNCTIONS
+                )
+        lines.append("}\n")
+        return "\n".join(lines)
+
+    def _schema_connection(self, name):
+        return "\n".join([
+            "type {name}Connection {{".format(name=name),
+            "    edges: [{name}Edge]".format(name=name),
+            "    nodes: [{name}]".format(name=name),
+            "    pageInfo: PageInfo!",
+            "    totalCount: Int",
+            "}",
+            "",
+            "type {name}Edge {{".format(name=name),
+            "    cursor: String!",
+            "    node: {name}".format(name=name),
+            "}\n",
+        ])
+
+    def _schema_sync(self, name):
+        return "\n".join([
+            "type {name}{suffix} {{".format(name=name, suffix=SYNC_SUFFIX),
+            "    records: [{name}]".format(name=name),
+            "    deleted: [ID]",
+            "    watermark: String!",
+            "    hasMore: Boolean!",
+            "}\n",
+        ])
+
+    def _schema_root(self, reverse_mapping):
+        names = sorted(reverse_mapping.values())
+        query = [
+            "    {name}(domain: Domain, ids: [ID], limit: Int, offset: Int, order: String): [{name}]".format(name=name)
+            for name in names
+        ] + [
+            "    {name}Connection(domain: Domain, first: Int, after: String, last: Int, before: String, "
+            "order: String, estimate: Boolean): {name}Connection".format(name=name)
+            for name in names
+        ] + [
+            "    {name}{suffix}(since: String, domain: Domain, limit: Int): {name}{suffix}".format(
+                name=name, suffix=SYNC_SUFFIX
+            )
+            for name in names
+        ]
+        aggregate = [
+            "    {name}{suffix}(domain: Domain, groupBy: [String], order: String, limit: Int, offset: Int): "
+            "[{name}{suffix}]".format(name=name, suffix=AGGREGATE_SUFFIX)
+            for name in names
+        ]
+        mutation = [
+            "    {name}(domain: Domain, ids: [ID], vals: Values, upsert: [String]): [{name}]".format(name=name)
+            for name in names
+        ]
+        return "\n".join(
+            ["scalar Domain", "scalar Values", ""]
+            + [self._schema_connection(name) for name in names]
+            + [self._schema_sync(name) for name in names]
+            + [
+                "type Binary {",
+                "    url: String",
+                "    signedUrl: String",
+                "    mimetype: String",
+                "    size: Int",
+                "    checksum: String",
+                "    base64: String",
+                "}",
+                "",
+                "type PageInfo {",
+                "    hasNextPage: Boolean!",
+                "    hasPreviousPage: Boolean!",
+                "    startCursor: String",
+                "    endCursor: String",
+                "}",
+                "",
+                "type Query {",
+            ]
+            + query
+            + aggregate
+            + ["}", "", "type Mutation {"] + mutation + ["}\n"]
+        )
 
-        res += "}\n"
-        return res
+    def _get_fields_versions(self):
+        # Any change of the fields of a model changes its version
+        self.env.cr.execute("""
+            SELECT model, max(write_date), count(*)
+            FROM ir_model_fields
+            GROUP BY model
+        """)
+        return {model: (str(date), count) for model, date, count in self.env.cr.fetchall()}
 
     def schema(self):
         ir_model_ids = self.get_allowed_models()
-        mapping = self.get_model_mapping()
-        reverse_mapping = {m._name: name for name, m in mapping.items()}
+        reverse_mapping = {model: name for name, model in self._get_model_names().items()}
         allowed_fields = self.get_allowed_fields()
+        versions = self._get_fields_versions()
+        groups = self._get_groups_signature()
+        # The relations are typed with the names of their comodels
+        names = hashlib.sha256(json.dumps(sorted(reverse_mapping.items())).encode()).hexdigest()
+
+        parts = []
+        defined = {}
+        for m in ir_model_ids:
+            allowed = allowed_fields.get(m.model)
+            key = (
+                self.env.cr.dbname,
+                m.model,
+                versions.get(m.model),
+                groups,
+                None if allowed is None else tuple(sorted(allowed)),
+                names,
+            )
+            res = _model_sdl_cache.get(key)
+            if res is None:
+                res = self._schema(m, reverse_mapping, allowed_fields)
+                _model_sdl_cache[key] = res
+            if res:
+                parts.append(res)
+                defined[m.model] = reverse_mapping[m.model]
+        parts.append(self._schema_root(defined))
+        return "\n".join(parts)
+
+    def get_schema_document(self, kind="sdl"):
+        """Return the (etag, gzip compressed content) of the schema
+
+        `kind` is either "sdl" or "introspection" for the JSON result of the
+        introspection query. Both are computed once per groups signature.
+        """
+        return self._get_schema_document(self._get_groups_signature(), kind)
+
+    @tools.ormcache("groups", "kind")
+    def _get_schema_document(self, groups, kind):
+        if kind == "introspection":
+            content = json.dumps({"data": graphql_sync(self.get_introspection_schema(), INTROSPECTION_QUERY).data})
+        else:
+            content = self.schema()
+        content = content.encode()
+        return hashlib.sha256(content).hexdigest(), gzip.compress(content)
+
+    def get_introspection_schema(self):
+        """Return the schema described by `schema`, answering the introspection queries"""
+        return self._get_introspection_schema(self._get_groups_signature())
+
+    @tools.ormcache("groups")
+    def _get_introspection_schema(self, groups):
+        return build_schema(self.schema())
+
+    def get_schema(self):
+        """Return the executable schema built from the `_graphql` definitions
+
+        It only depends on the models of the registry, so it is kept once in
+        its ormcache, which is rebuilt when modules are installed or upgraded.
+        None when no model defines `_graphql`.
+        """
+        return self._get_schema()
+
+    def _get_groups_signature(self):
+        return tuple(sorted(self.env.user.groups_id.ids))
+
+    @tools.ormcache()
+    def _get_schema(self):
+        queries = [
+            model._graphql
+            for model in self.env.registry.models.values()
+            if not model._abstract and getattr(model, "_graphql", None)
+        ]
+        if not queries:
+            return None
+        return build_ast_schema(get_document("\n".join(queries)))
+
+    def _register_hook(self):
+        super()._register_hook()
+        # Computed while loading the registry, so that the first request
+        # does not pay for it (and prefork workers inherit it).
+        try:
+            with self.env.cr.savepoint():
+                self._warmup()
+        except Exception:  # The registry must load anyway, the requests compute what is missing
+            _logger.warning("GraphQL warm-up of %s failed", self.env.cr.dbname, exc_info=True)
+
+    def _warmup(self):
+        """Compute the model names, access matrix and schemas of the most common groups"""
+        start = time.perf_counter()
+        stats = {"pid": os.getpid(), "signatures": 0, "errors": 0}
+        for uid in self._warmup_users():
+            handler = self.with_user(uid)
+            try:
+                with self.env.cr.savepoint():
+                    handler.get_model_mapping()
+                    handler.get_access_matrix()
+                    handler.get_schema_document("sdl")
+                    handler.get_schema_document("introspection")
+                stats["signatures"] += 1
+            except Exception as e:
+                stats["errors"] += 1
+                _logger.warning("GraphQL warm-up failed for user %s: %s", uid, e)
+        # The executable schema and the settings do not depend on the groups
+        try:
+            with self.env.cr.savepoint():
+                self.get_schema()
+        except Exception as e:  # e.g. an invalid `_graphql` definition
+            stats["errors"] += 1
+            _logger.warning("GraphQL warm-up of the executable schema failed: %s", e)
+        self.get_cost_limits()
+        self.get_stream_cost_limits()
+        self.get_result_cache_settings()
+        self.get_cache_control_settings()
+        self.get_tracing_sample_rate()
+        self.get_parallel_workers()
+        self.get_sync_models()
+        stats["duration"] = time.perf_counter() - start
+        stats["date"] = time.time()
+        _warmup_stats[self.env.cr.dbname] = stats
+        _logger.info(
+            "GraphQL warm-up of %s: %d groups signatures in %.3fs",
+            self.env.cr.dbname, stats["signatures"], stats["duration"],
+        )
+
+    def _warmup_users(self):
+        """Return a user of each of the most common groups signatures
 
-        res = "\n".join(
-            self._schema(m, reverse_mapping, allowed_fields) for m in ir_model_ids
+        The superuser and the public user come first.
+        """
+        count = int(
+            self.env["ir.config_parameter"].sudo().get_param("graphql.warmup_signatures", DEFAULT_WARMUP_SIGNATURES)
         )
-        return res
+        uids = [SUPERUSER_ID]
+        public = self.env.ref("base.public_user", raise_if_not_found=False)
+        if public:
+            uids.append(public.id)
+        if count <= 0:
+            return uids
+        self.env.cr.execute("""
+            SELECT min(uid), count(*)
+            FROM (
+                SELECT u.id AS uid, array_agg(r.gid ORDER BY r.gid) AS groups
+                FROM res_users u
+                JOIN res_groups_users_rel r ON r.uid = u.id
+                WHERE u.active
+                GROUP BY u.id
+            ) signatures
+            GROUP BY groups
+            ORDER BY count(*) DESC
+            LIMIT %s
+        """, [count])
+        return uids + [uid for uid, users in self.env.cr.fetchall() if uid not in uids]
 
     def get_field_resolver(model, field):
     # Define the field resolver function
         def resolve_field(parent, info):
-            # Retrieve the IDs of the records to retrieve
-            ids = parent.ids if isinstance(parent, models.BaseModel) else [parent.id]
-        
-             # Retrieve the company ID if it exists
+            records = parent if isinstance(parent, models.BaseModel) else model.browse([parent.id])
+
+            # Retrieve the company ID if it exists
             company_id = info.context.get('company_id')
-        
-            # Retrieve the records
-            records = get_records(model, field, ids, company_id)
-        
-        # Return the field value for each record
-            return [getattr(record, field) for record in records]
-    
+            if company_id:
+                records = records.with_company(company_id)
+
+            # Records keep the prefetch set of their parent: the field is read
+            # once for all the siblings instead of once per parent record
+            return [record[field] for record in records]
+
         return resolve_field
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+from odoo import api, fields, models, tools
+from odoo.exceptions import ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+ALLOW_LIST_PARAM = "graphql.persisted_queries_only"
+
+
+class GraphQLPersistedQuery(models.Model):
+    """Documents registered through the automatic persisted queries protocol
+
+    https://github.com/apollographql/apollo-link-persisted-queries#protocol
+    The table is shared by all the workers, each one keeping the documents
+    it already looked up in its ormcache.
+    """
+    _name = "graphql.persisted.query"
+    _description = "GraphQL Persisted Query"
+    _rec_name = "sha256"
+
+    sha256 = fields.Char(string="SHA-256", required=True, index=True, readonly=True)
+    query = fields.Text(required=True)
+
+    _sql_constraints = [
+        ("sha256_uniq", "unique(sha256)", "This query is already registered."),
+    ]
+
+    @api.model
+    def _hash(self, query):
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get("query"):
+                vals["sha256"] = self._hash(vals["query"])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if "query" in vals:
+            vals = dict(vals, sha256=self._hash(vals["query"]))
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+    @api.model
+    def _allow_list_only(self):
+        param = self.env["ir.config_parameter"].sudo().get_param(ALLOW_LIST_PARAM)
+        return param not in (False, "", "0", "False", "false")
+
+    @tools.ormcache("sha256")
+    def _lookup_query(self, sha256):
+        # Misses raise instead of returning None so that they are not cached:
+        # another worker may register the document in the meantime.
+        self.env.cr.execute(
+            "SELECT query FROM graphql_persisted_query WHERE sha256 = %s", (sha256,)
+        )
+        row = self.env.cr.fetchone()
+        if not row:
+            raise KeyError(sha256)
+        return row[0]
+
+    @api.model
+    def _register(self, sha256, query):
+        # Concurrent workers may register the same document
+        self.env.cr.execute(
+            """
+            INSERT INTO graphql_persisted_query
+                (sha256, query, create_uid, write_uid, create_date, write_date)
+            VALUES (%s, %s, %s, %s, now() at time zone 'UTC', now() at time zone 'UTC')
+            ON CONFLICT (sha256) DO NOTHING
+            """,
+            (sha256, query, self.env.uid, self.env.uid),
+        )
+
+    @api.model
+    def _resolve_query(self, query, extensions=None):
+        """Return the document to execute for a request
+
+        `extensions` is the "extensions" entry of the request which may
+        contain the persisted query hash. Unknown documents are registered,
+        unless the allow-list mode is enabled in which case they are rejected.
+        """
+        self = self.sudo()
+        persisted = (extensions or {}).get("persistedQuery")
+        allow_list = self._allow_list_only()
+        if not persisted:
+            if allow_list and query:
+                try:
+                    self._lookup_query(self._hash(query))
+                except KeyError:
+                    raise ValidationError("PersistedQueryNotAllowed")
+            return query
+
+        if persisted.get("version", 1) != 1:
+            raise ValidationError("PersistedQueryNotSupported")
+        sha256 = persisted.get("sha256Hash")
+        try:
+            return self._lookup_query(sha256)
+        except KeyError:
+            pass
+        if not query:
+            # The client will retry with the whole document
+            raise ValidationError("PersistedQueryNotFound")
+        if allow_list:
+            raise ValidationError("PersistedQueryNotAllowed")
+        if self._hash(query) != sha256:
+            raise ValidationError("provided sha does not match query")
+        _logger.debug("Registering persisted query %s", sha256)
+        self._register(sha256, query)
+        return query
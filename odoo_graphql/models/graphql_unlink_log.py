@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models, tools
+
+from ..sync import SYNC_RETENTION
+
+
+class GraphQLUnlinkLog(models.Model):
+    """Records deleted from the models listed in the "graphql.sync_models" parameter
+
+    Read by the delta synchronization to send the deleted ids to the
+    clients, see `sync.py`. Rows are inserted in the transaction deleting
+    the records, with one query per call to `unlink`.
+    """
+    _name = "graphql.unlink.log"
+    _description = "GraphQL Unlink Log"
+    _log_access = False
+    _order = "date, id"
+
+    model = fields.Char(required=True, readonly=True)
+    res_id = fields.Integer(required=True, readonly=True)
+    date = fields.Datetime(required=True, readonly=True)
+
+    def init(self):
+        tools.create_index(
+            self.env.cr, "graphql_unlink_log_model_date_id_index", self._table, ["model", "date", "id"]
+        )
+
+    @api.model
+    def _record(self, model_name, ids):
+        if not ids:
+            return
+        self.env.cr.execute(
+            """
+            INSERT INTO graphql_unlink_log (model, res_id, date)
+            SELECT %s, unnest(%s), now() at time zone 'UTC'
+            """,
+            (model_name, list(ids)),
+        )
+
+    @api.model
+    def _deleted(self, model_name, position, limit=None):
+        """Return the (date, id, deleted record id) of the deletions after the position"""
+        self.env.cr.execute(
+            """
+            SELECT date, id, res_id FROM graphql_unlink_log
+            WHERE model = %s AND (date, id) > (%s, %s)
+            ORDER BY date, id
+            LIMIT %s
+            """,
+            (model_name, position[0], position[1], limit),
+        )
+        return self.env.cr.fetchall()
+
+    @api.autovacuum
+    def _gc_unlink_log(self):
+        self.env.cr.execute(
+            "DELETE FROM graphql_unlink_log WHERE date < %s", (fields.Datetime.now() - SYNC_RETENTION,)
+        )
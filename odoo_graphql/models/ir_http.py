@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+from odoo.exceptions import AccessDenied
+from odoo.http import request
+
+from ..auth import get_bearer_token, verify_token
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = "ir.http"
+
+    @classmethod
+    def _auth_method_graphql(cls):
+        """Authenticate with an API key sent as bearer token, else with the session"""
+        token = get_bearer_token(request.httprequest)
+        if token is None:
+            return cls._auth_method_user()
+        uid = verify_token(request.env, token)
+        if not uid:
+            raise AccessDenied()
+        if hasattr(request, "update_env"):  # Odoo >= 16
+            request.update_env(user=uid)
+        else:
+            request.uid = uid
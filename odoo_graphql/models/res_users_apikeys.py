@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+from ..auth import clear_verified_tokens
+
+
+class ResUsersApiKeys(models.Model):
+    _inherit = "res.users.apikeys"
+
+    def _remove(self):
+        # The other workers keep trusting the key until their entry expires
+        clear_verified_tokens()
+        return super()._remove()
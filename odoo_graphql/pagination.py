@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Keyset (cursor) pagination
+# https://relay.dev/graphql/connections.htm
+import base64
+import json
+
+from odoo.exceptions import ValidationError
+from odoo.osv import expression
+
+CONNECTION_SUFFIX = "Connection"
+
+# Fields that Postgres can not compare the way Odoo orders them
+# Booleans too: Odoo reads null as False, but Postgres sorts null apart from false
+UNORDERABLE_TYPES = ("many2one", "one2many", "many2many", "binary", "html", "reference", "boolean")
+# Records per page without first or last, and the most that can be asked for
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_order(model, order=None):
+    """Return the ordering terms as (field name, ascending) pairs
+
+    The id is always the last term so that the order is total.
+    """
+    terms = []
+    for term in (order or "").split(","):
+        parts = term.split()
+        if not parts:
+            continue
+        if len(parts) > 2 or (len(parts) == 2 and parts[1].lower() not in ("asc", "desc")):
+            raise ValidationError(f"Invalid order for pagination: {term.strip()}")
+        name = parts[0]
+        field = model._fields.get(name)
+        if field is None or not field.store or field.type in UNORDERABLE_TYPES:
+            raise ValidationError(f"Cannot paginate on field {name} of model {model._name}")
+        terms.append((name, len(parts) == 1 or parts[1].lower() == "asc"))
+        if name == "id":  # Unique: the next terms are never used
+            break
+    if not terms or terms[-1][0] != "id":
+        terms.append(("id", terms[0][1] if terms else True))
+    return terms
+
+
+def connection_nodes(fields):
+    """Return the fields selected on the nodes of a connection"""
+    nodes = ()
+    for field in fields:
+        if field.name == "edges":
+            for edge in field.fields:
+                if edge.name == "node":
+                    nodes += edge.fields
+        elif field.name == "nodes":
+            nodes += field.fields
+    return nodes
+
+
+def order2str(terms, reverse=False):
+    return ", ".join(
+        "{} {}".format(name, "asc" if asc != reverse else "desc")
+        for name, asc in terms
+    )
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor, terms):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != len(terms):
+        raise ValidationError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def keyset_domain(terms, values, reverse=False):
+    """Return the domain of the records strictly after the given values
+
+    With `reverse`, the records strictly before them are returned instead.
+    Postgres puts null values last in ascending order and first otherwise.
+    The values are read by the ORM, where False stands for null: the
+    boolean fields, whose False is a value, can not be terms.
+    """
+    domains = []
+    for i, ((name, asc), value) in enumerate(zip(terms, values)):
+        asc = asc != reverse
+        if value is None or value is False:
+            if asc:  # Only null values follow a null value
+                continue
+            after = [(name, "!=", False)]
+        else:
+            after = [(name, ">" if asc else "<", value)]
+            if asc:
+                after = expression.OR([after, [(name, "=", False)]])
+        prefix = [(n, "=", v) for (n, _), v in zip(terms[:i], values[:i])]
+        domains.append(expression.AND([prefix, after]) if prefix else after)
+    return expression.OR(domains)
+
+
+def estimate_count(model, domain):
+    """Return the number of records estimated by the Postgres planner"""
+    query = model._where_calc(domain)
+    model._apply_ir_rules(query, "read")
+    sql, params = query.select()
+    model.env.cr.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    return int(model.env.cr.fetchone()[0][0]["Plan"]["Plan Rows"])
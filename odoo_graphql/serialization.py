@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+# JSON encoding of the responses
+# The values read from the ORM (dates, decimals, many2one pairs, bytes,
+# recordsets) are encoded directly, by orjson when it is installed and by
+# the standard library otherwise. Both produce compact UTF-8 bytes and
+# write dates the way Odoo does ("2024-01-31 12:00:00").
+import datetime
+import decimal
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(value):
+    """Return a JSON-compatible version of the values not handled by the encoders"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, bytes):  # e.g. base64 content
+        return value.decode()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "_ids"):  # Recordset
+        return list(value._ids)
+    return str(value)
+
+
+if orjson is not None:
+    # Dates are left to `default`, orjson would use the ISO format
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """Return the JSON encoding of `value`, as bytes"""
+        return orjson.dumps(value, default=default, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, check_circular=False, default=default)
+
+    def dumps(value):
+        """Return the JSON encoding of `value`, as bytes"""
+        return _encoder.encode(value).encode()
+
+    loads = json.loads
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# Delta synchronization of a model for offline clients
+# e.g. SaleOrderChanges(since: $watermark, limit: 500) { records { id name } deleted watermark hasMore }
+# The watermark holds the (write_date, id) of the last record sent and the
+# (date, id) of the last deletion sent, so that only the changes are read.
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT
+
+from .pagination import decode_cursor, encode_cursor
+
+SYNC_SUFFIX = "Changes"
+# Write dates are set when a transaction starts, not when it is committed:
+# the changes of the last SYNC_MARGIN are sent again by the next synchronization
+SYNC_MARGIN = timedelta(seconds=60)
+# Deletions kept in graphql.unlink.log, an older watermark must start over
+SYNC_RETENTION = timedelta(days=30)
+WATERMARK_TERMS = ("write_date", "id", "deleted_date", "deleted_id")
+# Positions keep their microseconds, two changes of the same second must not be confused
+POSITION_FORMAT = DEFAULT_SERVER_DATETIME_FORMAT + ".%f"
+
+
+def sync_records(fields):
+    """Return the fields selected on the records of a synchronization"""
+    records = ()
+    for field in fields:
+        if field.name == "records":
+            records += field.fields
+    return records
+
+
+def _position(date, record_id):
+    if isinstance(date, str):
+        date = datetime.strptime(date, POSITION_FORMAT if "." in date else DEFAULT_SERVER_DATETIME_FORMAT)
+    if not isinstance(date, datetime) or not isinstance(record_id, int):
+        raise ValueError(f"Invalid position: {date}, {record_id}")
+    return [date, record_id]
+
+
+def decode_watermark(watermark):
+    """Return the (records, deletions) positions of a watermark, as (datetime, id) pairs"""
+    values = decode_cursor(watermark, WATERMARK_TERMS)
+    try:
+        records_position, deleted_position = _position(*values[:2]), _position(*values[2:])
+    except ValueError:
+        raise ValidationError(f"Invalid watermark: {watermark}")
+    if deleted_position[0] < fields.Datetime.now() - SYNC_RETENTION:
+        raise ValidationError("Watermark expired, synchronize again without it")
+    return records_position, deleted_position
+
+
+def encode_watermark(records_position, deleted_position):
+    return encode_cursor([
+        value.strftime(POSITION_FORMAT) if isinstance(value, datetime) else value
+        for value in list(records_position) + list(deleted_position)
+    ])
+
+
+def sync_cutoff():
+    """Return the date before which the changes are considered committed"""
+    return fields.Datetime.now() - SYNC_MARGIN
+
+
+def settle(position, cutoff):
+    """Return the position, moved back to `cutoff` if it is more recent
+
+    Transactions still running may commit changes dated before it.
+    """
+    if position is not None and position[0] < cutoff:
+        return position
+    return [cutoff, 0]
+
+
+def after_domain(position):
+    """Return the domain of the records changed after the position
+
+    Both conditions can be answered by an index on (write_date, id).
+    """
+    date, record_id = position
+    return ["|", ("write_date", ">", date), "&", ("write_date", "=", date), ("id", ">", record_id)]
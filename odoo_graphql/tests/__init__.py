@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+from . import test_access
+from . import test_aggregate
+from . import test_batch
+from . import test_binary
+from . import test_cache
+from . import test_concurrency
+from . import test_controller
+from . import test_cost
+from . import test_pagination
+from . import test_result_cache
+from . import test_serialization
+from . import test_sync
+from . import test_upsert
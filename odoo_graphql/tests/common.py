@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Fixtures shared by the tests
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from odoo.tests.common import HttpCase
+
+from ..serialization import dumps, loads
+
+RELATIONAL_TYPES = ("many2one", "one2many", "many2many")
+
+
+def make_field(name, type="char", comodel_name=None, store=True, compute=None, depends=()):
+    """Return a stand-in of a field, with the attributes read when planning a query"""
+    return SimpleNamespace(
+        name=name,
+        type=type,
+        comodel_name=comodel_name,
+        store=store,
+        compute=compute,
+        depends=depends,
+        relational=type in RELATIONAL_TYPES,
+        model_name=None,
+    )
+
+
+def make_env(models):
+    """Return a stand-in of an environment from the fields of each model, by model name"""
+    env = {}
+    for name, fields in models.items():
+        env[name] = SimpleNamespace(_name=name, env=env, _fields={})
+        for field in fields:
+            field.model_name = name
+            env[name]._fields[field.name] = field
+    return env
+
+
+class GraphQLHttpCase(HttpCase):
+    """Send the operations to /graphql, logged in as the administrator"""
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate("admin", "admin")
+
+    def graphql(self, payload, **params):
+        """Return the decoded response to a POST of `payload`, a query or the JSON body"""
+        if isinstance(payload, str):
+            payload = {"query": payload}
+        response = self.url_open(
+            "/graphql?" + urlencode(params) if params else "/graphql",
+            data=dumps(payload),
+            headers={"Content-Type": "application/graphql"},
+        )
+        self.assertEqual(response.status_code, 200)
+        return loads(response.content)
+
+    def graphql_get(self, params, headers=None):
+        """Return the response to a GET with `params` in the query string"""
+        params = {key: value if isinstance(value, str) else dumps(value).decode() for key, value in params.items()}
+        return self.url_open("/graphql?" + urlencode(params), headers=headers)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestAccess(TransactionCase):
+    def test_has_groups(self):
+        handler = self.env["graphql.handler"].with_user(self.env.ref("base.user_admin"))
+        self.assertTrue(handler._has_groups("base.group_user"))
+        self.assertFalse(handler._has_groups("base.group_portal"))
+        self.assertTrue(handler._has_groups("base.group_portal, base.group_user"))
+        # Only negations: allowed unless one of them matches
+        self.assertTrue(handler._has_groups("!base.group_portal"))
+        self.assertTrue(handler._has_groups("!base.group_portal,!base.group_public"))
+        self.assertFalse(handler._has_groups("!base.group_user"))
+        self.assertFalse(handler._has_groups("base.group_system,!base.group_user"))
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import BaseCase, tagged
+
+from ..aggregate import aggregate_specs, parse_groupby
+from .common import make_env, make_field
+
+MODEL = make_env({
+    "sale.order": [
+        make_field("id", "integer"),
+        make_field("state", "selection"),
+        make_field("date_order", "datetime"),
+        make_field("partner_id", "many2one", "res.partner"),
+        make_field("order_line", "one2many", "sale.order.line"),
+        make_field("amount_total", "monetary"),
+        make_field("amount_computed", "monetary", store=False),
+        make_field("note", "html"),
+    ],
+})["sale.order"]
+
+
+def select(*names):
+    return [SimpleNamespace(name=name) for name in names]
+
+
+@tagged("odoo_graphql")
+class TestAggregate(BaseCase):
+    def test_parse_groupby(self):
+        self.assertEqual(
+            parse_groupby(MODEL, ["state", "date_order:month"]), {"state": "state", "date_order": "date_order:month"}
+        )
+        self.assertEqual(parse_groupby(MODEL, "partner_id"), {"partner_id": "partner_id"})
+        self.assertEqual(parse_groupby(MODEL, None), {})
+        for groupby in ("id", "order_line", "note", "unknown", "state:month", "date_order:hour"):
+            with self.assertRaises(ValidationError, msg=groupby):
+                parse_groupby(MODEL, [groupby])
+        with self.assertRaises(ValidationError):
+            parse_groupby(MODEL, ["state"], allowed={"partner_id"})
+
+    def test_aggregate_specs(self):
+        groupby = parse_groupby(MODEL, ["state"])
+        self.assertEqual(
+            aggregate_specs(MODEL, select("state", "count", "amount_total_sum", "amount_total_max"), groupby),
+            ["__count", "amount_total_sum:sum(amount_total)", "amount_total_max:max(amount_total)"],
+        )
+        self.assertEqual(aggregate_specs(MODEL, select("count"), groupby), ["__count"])
+
+    def test_aggregate_specs_invalid(self):
+        groupby = parse_groupby(MODEL, ["state"])
+        # Not grouped, not numeric, not stored, unknown function
+        for name in ("partner_id", "state_sum", "amount_computed_sum", "amount_total_median", "id_sum"):
+            with self.assertRaises(ValidationError, msg=name):
+                aggregate_specs(MODEL, select(name), groupby)
+        with self.assertRaises(ValidationError):
+            aggregate_specs(MODEL, select("amount_total_sum"), groupby, allowed={"state"})
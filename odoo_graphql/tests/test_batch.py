@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import BaseCase, TransactionCase, tagged
+
+from ..utils import BatchLoader, compile_document, parse_fields
+
+
+@tagged("odoo_graphql")
+class TestMergeFields(BaseCase):
+    def test_same_key(self):
+        fields = compile_document("{ ResPartner { user_id { name } user_id { login } name } }").fields[0].fields
+        self.assertEqual([field.name for field in fields], ["user_id", "name"])
+        self.assertEqual([field.name for field in fields[0].fields], ["name", "login"])
+
+    def test_fragments(self):
+        fields = compile_document(
+            "{ ResPartner { name ...P } } fragment P on ResPartner { name user_id { login } user_id { name } }"
+        ).fields[0].fields
+        self.assertEqual([field.name for field in fields], ["name", "user_id"])
+        self.assertEqual([field.name for field in fields[1].fields], ["login", "name"])
+
+    def test_aliases(self):
+        # Different response keys stay apart
+        fields = compile_document("{ ResPartner { a: user_id { name } b: user_id { login } } }").fields[0].fields
+        self.assertEqual([field.alias for field in fields], ["a", "b"])
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestBatchLoader(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        Partner = self.env["res.partner"]
+        self.parent = Partner.create({"name": "GQL-BATCH", "user_id": self.env.user.id})
+        self.children = Partner.create([
+            {"name": f"GQL-BATCH-{i}", "parent_id": self.parent.id, "user_id": self.env.user.id} for i in range(3)
+        ])
+
+    def fields(self, selection):
+        return compile_document("{ ResPartner %s }" % selection).fields[0].fields
+
+    def test_reads_per_depth(self):
+        loader = BatchLoader()
+        values = parse_fields(
+            self.children,
+            self.fields("{ name parent_id { name child_ids { name } } user_id { login } }"),
+            loader=loader,
+        )
+        self.assertEqual([value["parent_id"]["name"] for value in values], ["GQL-BATCH"] * 3)
+        self.assertEqual(values[0]["user_id"]["login"], self.env.user.login)
+        # One read by model and depth, whatever the number of records
+        self.assertEqual(dict(loader.reads), {0: 1, 1: 2, 2: 1})
+
+    def test_same_relation_twice(self):
+        values = parse_fields(self.parent, self.fields("{ user_id { name } user_id { login } }"))
+        self.assertEqual(values[0]["user_id"], {"name": self.env.user.name, "login": self.env.user.login})
+
+    def test_projection(self):
+        # Only the selected columns are read, the binary fields are left to resolve_binary
+        loader = BatchLoader()
+        parse_fields(self.children, self.fields("{ name image_128 parent_id { email } }"), loader=loader)
+        columns = {(key[0], key[1]) for key in loader._rows}
+        self.assertEqual(columns, {("res.partner", ("name", "parent_id")), ("res.partner", ("email",))})
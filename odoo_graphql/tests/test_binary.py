@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import time
+from unittest.mock import patch
+
+from odoo.tests.common import HttpCase, TransactionCase, tagged
+
+from ..binary import check_signature, signed_url, variant
+
+# 1x1 transparent PNG
+PNG = base64.b64encode(
+    bytes.fromhex(
+        "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+        "1f15c4890000000b49444154789c6360000200000500017a5eab3f0000000049454e44ae426082"
+    )
+)
+
+
+def tamper(token):
+    return token[:-1] + ("1" if token[-1] == "0" else "0")
+
+
+def url_terms(url):
+    """Return the (model, id, field, expires, token) of a signed URL"""
+    path, _, query = url.partition("?")
+    model, record_id, name = path.split("/")[-3:]
+    params = dict(term.split("=") for term in query.split("&"))
+    return model, int(record_id), name, params["expires"], params["token"]
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestBinary(TransactionCase):
+    def test_variant(self):
+        Partner = self.env["res.partner"]
+        self.assertEqual(variant(Partner, "image_1920", 128), "image_128")
+        self.assertEqual(variant(Partner, "image_1920", None), "image_1920")
+        self.assertEqual(variant(Partner, "image_1920", 100), "image_1920")  # Resized on the fly
+        # A variant the user can not read is not served instead
+        self.assertEqual(variant(Partner, "image_1920", 128, allowed={"image_1920"}), "image_1920")
+        self.assertEqual(variant(Partner, "image_1920", 128, allowed={"image_1920", "image_128"}), "image_128")
+
+    def test_signature(self):
+        terms = url_terms(signed_url(self.env, "res.partner", 7, "image_1920"))
+        self.assertTrue(check_signature(self.env, *terms))
+        model, record_id, name, expires, token = terms
+        # Any other record, field, expiry or token is refused
+        self.assertFalse(check_signature(self.env, model, record_id + 1, name, expires, token))
+        self.assertFalse(check_signature(self.env, model, record_id, "image_128", expires, token))
+        self.assertFalse(check_signature(self.env, model, record_id, name, int(expires) + 1, token))
+        self.assertFalse(check_signature(self.env, model, record_id, name, expires, tamper(token)))
+        self.assertFalse(check_signature(self.env, model, record_id, name, "never", token))
+        with patch.object(time, "time", return_value=int(expires) + 1):
+            self.assertFalse(check_signature(self.env, *terms))
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestBinaryRoute(HttpCase):
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env["res.partner"].create({"name": "GQL-BINARY", "image_1920": PNG})
+
+    def test_signed_url(self):
+        url = signed_url(self.env, "res.partner", self.partner.id, "image_1920")
+        response = self.url_open(url)  # Without session
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], "image/png")
+        self.assertEqual(response.headers["X-Content-Type-Options"], "nosniff")
+        self.assertEqual(response.content, base64.b64decode(PNG))
+        self.assertEqual(self.url_open(url.replace("image_1920", "image_128")).status_code, 404)
+        self.assertEqual(self.url_open(tamper(url)).status_code, 404)
+
+    def test_expired_url(self):
+        url = signed_url(self.env, "res.partner", self.partner.id, "image_1920", lifetime=-1)
+        self.assertEqual(self.url_open(url).status_code, 404)
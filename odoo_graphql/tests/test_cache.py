@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import BaseCase, TransactionCase, tagged
+
+from ..cache import LRUCache
+from ..utils import clear_plan_cache, compile_document, get_document_key, plan_cache_stats
+
+
+@tagged("odoo_graphql")
+class TestPlanCache(BaseCase):
+    def setUp(self):
+        super().setUp()
+        clear_plan_cache()
+        self.addCleanup(clear_plan_cache)
+
+    def test_lru(self):
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache.get("a"), 1)  # b is now the least recently used
+        cache["c"] = 3
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("b", "missing"), "missing")
+        self.assertEqual(cache.stats(), {"size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1})
+
+    def test_plan_reused(self):
+        query = "query Q($withEmail: Boolean!) { ResPartner { name email @include(if: $withEmail) } }"
+        plan = compile_document(query, variables={"withEmail": True})
+        self.assertIs(compile_document(query, variables={"withEmail": True}), plan)
+        # Only the truthiness of the directive variables changes the plan
+        self.assertIs(compile_document(query, variables={"withEmail": 1}), plan)
+        other = compile_document(query, variables={"withEmail": False})
+        self.assertEqual([field.name for field in plan.fields[0].fields], ["name", "email"])
+        self.assertEqual([field.name for field in other.fields[0].fields], ["name"])
+        self.assertEqual(plan_cache_stats()["plans"]["size"], 2)
+
+    def test_document_key(self):
+        # Formatting and comments do not change the key
+        key = get_document_key("{ ResPartner { name } }")
+        self.assertEqual(get_document_key("# Partners\n{\n  ResPartner {\n    name\n  }\n}"), key)
+        self.assertNotEqual(get_document_key("{ ResPartner { email } }"), key)
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestHandlerPlanCache(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        clear_plan_cache()
+        self.addCleanup(clear_plan_cache)
+
+    def test_formatting(self):
+        partner = self.env["res.partner"].create({"name": "GQL-PLAN"})
+        handler = self.env["graphql.handler"]
+        variables = {"ids": [partner.id]}
+        first = handler.handle_graphql("query P($ids: [Int]) { ResPartner(ids: $ids) { name } }", variables)
+        second = handler.handle_graphql(
+            "# Reformatted\nquery P($ids: [Int]) {\n  ResPartner(ids: $ids) { name }\n}", variables
+        )
+        self.assertEqual(first["data"], {"ResPartner": [{"name": "GQL-PLAN"}]})
+        self.assertEqual(second["data"], first["data"])
+        # Compiled once for both documents
+        self.assertEqual(plan_cache_stats()["plans"]["size"], 1)
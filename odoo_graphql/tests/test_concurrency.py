@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api
+from odoo.tests.common import TransactionCase, tagged
+
+from ..concurrency import export_snapshot, resolve_concurrently
+
+
+def count_changes(env):
+    env.cr.execute("SELECT current_setting('transaction_read_only'), count(*) FROM graphql_change_log")
+    return env.cr.fetchone()
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestConcurrency(TransactionCase):
+    def test_modified_transaction(self):
+        # Its changes would not be visible to the other cursors
+        self.env["res.partner"].create({"name": "GQL-SNAPSHOT"})
+        self.assertIsNone(export_snapshot(self.env.cr))
+
+    def test_shared_snapshot(self):
+        if getattr(self.registry, "test_cr", None) is not None:
+            self.skipTest("The cursors of the registry are the test cursor")
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            snapshot = export_snapshot(cr)
+            self.assertTrue(snapshot)
+            before = count_changes(env)[1]
+            # Committed by another transaction after the snapshot was exported
+            with self.registry.cursor() as other:
+                other.execute("INSERT INTO graphql_change_log (model, date) VALUES ('res.partner', now()) RETURNING id")
+                log_id = other.fetchone()[0]
+            self.addCleanup(self._delete_change, log_id)
+            self.assertEqual(resolve_concurrently(env, [count_changes] * 2, 2), [("on", before + 1)] * 2)
+            self.assertEqual(
+                resolve_concurrently(env, [count_changes] * 2, 2, snapshot=snapshot), [("on", before)] * 2
+            )
+
+    def _delete_change(self, log_id):
+        with self.registry.cursor() as cr:
+            cr.execute("DELETE FROM graphql_change_log WHERE id = %s", [log_id])
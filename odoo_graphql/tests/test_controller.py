@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+from graphql import get_introspection_query
+
+from odoo.tests.common import tagged
+
+from .common import GraphQLHttpCase
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestController(GraphQLHttpCase):
+    def setUp(self):
+        super().setUp()
+        self.partners = self.env["res.partner"].create([
+            {"name": f"GQL-HTTP-{i}", "color": i % 2} for i in range(3)
+        ])
+
+    def test_connection(self):
+        query = """query Page($after: String) {
+            ResPartnerConnection(domain: [["name", "=like", "GQL-HTTP-%"]], first: 2, after: $after, order: "name") {
+                totalCount
+                edges { node { name } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }"""
+        page = self.graphql(query)["data"]["ResPartnerConnection"]
+        self.assertEqual(page["totalCount"], 3)
+        self.assertEqual([edge["node"]["name"] for edge in page["edges"]], ["GQL-HTTP-0", "GQL-HTTP-1"])
+        self.assertTrue(page["pageInfo"]["hasNextPage"])
+        page = self.graphql({"query": query, "variables": {"after": page["pageInfo"]["endCursor"]}})
+        page = page["data"]["ResPartnerConnection"]
+        self.assertEqual([edge["node"]["name"] for edge in page["edges"]], ["GQL-HTTP-2"])
+        self.assertFalse(page["pageInfo"]["hasNextPage"])
+
+    def test_aggregate(self):
+        groups = self.graphql("""{
+            ResPartnerAggregate(domain: [["name", "=like", "GQL-HTTP-%"]], groupBy: ["color"], order: "color") {
+                color
+                count
+            }
+        }""")["data"]["ResPartnerAggregate"]
+        self.assertEqual(groups, [{"color": 0, "count": 2}, {"color": 1, "count": 1}])
+
+    def test_changes(self):
+        self.env["ir.config_parameter"].sudo().set_param("graphql.sync_models", "res.partner")
+        query = """query Sync($since: String) {
+            ResPartnerChanges(since: $since, domain: [["name", "=like", "GQL-HTTP-%"]], limit: 10) {
+                records { id name }
+                deleted
+                watermark
+                hasMore
+            }
+        }"""
+        changes = self.graphql(query)["data"]["ResPartnerChanges"]
+        self.assertEqual([record["name"] for record in changes["records"]], self.partners.mapped("name"))
+        self.assertEqual(changes["deleted"], [])
+        self.assertFalse(changes["hasMore"])
+        deleted = self.partners[0]
+        deleted_id = deleted.id
+        deleted.unlink()
+        changes = self.graphql({"query": query, "variables": {"since": changes["watermark"]}})
+        changes = changes["data"]["ResPartnerChanges"]
+        self.assertEqual(changes["deleted"], [deleted_id])
+        self.assertNotIn(deleted_id, [record["id"] for record in changes["records"]])
+
+    def test_persisted_query(self):
+        query = '{ ResPartner(domain: [["name", "=", "GQL-HTTP-1"]]) { name } }'
+        sha256 = hashlib.sha256(query.encode()).hexdigest()
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": sha256}}
+        # The client retries with the document, which must match its hash
+        response = self.graphql({"extensions": extensions})
+        self.assertIn("PersistedQueryNotFound", response["errors"][0])
+        wrong = {"persistedQuery": {"version": 1, "sha256Hash": hashlib.sha256(b"{}").hexdigest()}}
+        response = self.graphql({"query": query, "extensions": wrong})
+        self.assertIn("provided sha does not match query", response["errors"][0])
+        self.assertEqual(self.graphql({"query": query, "extensions": extensions})["data"], {
+            "ResPartner": [{"name": "GQL-HTTP-1"}],
+        })
+        # Then only the hash is sent
+        self.assertEqual(self.graphql({"extensions": extensions})["data"], {"ResPartner": [{"name": "GQL-HTTP-1"}]})
+
+    def test_batch(self):
+        def create(name):
+            return {"query": 'mutation { ResPartner(vals: {name: "%s"}) { name } }' % name}
+
+        failing = {"query": """mutation {
+            ResPartner(vals: {name: "GQL-BATCH-ROLLBACK"}) { name }
+            UnknownModel(vals: {name: "GQL-BATCH-ROLLBACK"}) { name }
+        }"""}
+        Partner = self.env["res.partner"]
+        results = self.graphql([create("GQL-BATCH-1"), failing, create("GQL-BATCH-2")])
+        self.assertFalse(results[0].get("errors"))
+        self.assertTrue(results[1]["errors"])
+        self.assertEqual(results[2]["errors"], ["Not executed, a previous operation failed"])
+        # The failing operation is rolled back, the ones before it are kept
+        self.assertTrue(Partner.search([("name", "=", "GQL-BATCH-1")]))
+        self.assertFalse(Partner.search([("name", "in", ("GQL-BATCH-ROLLBACK", "GQL-BATCH-2"))]))
+
+        results = self.graphql([failing, create("GQL-BATCH-3")], isolate=1)
+        self.assertTrue(results[0]["errors"])
+        self.assertFalse(results[1].get("errors"))
+        self.assertFalse(Partner.search([("name", "=", "GQL-BATCH-ROLLBACK")]))
+        self.assertTrue(Partner.search([("name", "=", "GQL-BATCH-3")]))
+
+    def test_stream(self):
+        query = """{
+            ResPartner(domain: [["name", "=like", "GQL-HTTP-%"]], order: "name") { name color }
+            Count: ResPartnerAggregate(domain: [["name", "=like", "GQL-HTTP-%"]]) { count }
+        }"""
+        streamed = self.graphql(query, stream=1)
+        self.assertEqual(streamed["data"]["ResPartner"], [
+            {"name": f"GQL-HTTP-{i}", "color": i % 2} for i in range(3)
+        ])
+        self.assertEqual(streamed["data"], self.graphql(query)["data"])
+
+    def test_company(self):
+        company = self.env["res.company"].create({"name": "GQL-HTTP-COMPANY"})
+        self.env["res.partner"].create({"name": "GQL-HTTP-OTHER", "company_id": company.id})
+        query = '{ ResPartner(domain: [["name", "=", "GQL-HTTP-OTHER"]]) { name } }'
+        # Not a company of the user
+        response = self.graphql({"query": query, "auth": {"company_id": company.id}})
+        self.assertEqual(response["errors"], {"message": f"Company {company.id} is not allowed"})
+        self.env.ref("base.user_admin").write({"company_ids": [(4, company.id)]})
+        self.assertEqual(self.graphql(query)["data"], {"ResPartner": []})
+        response = self.graphql({"query": query, "auth": {"company_id": company.id}})
+        self.assertEqual(response["data"], {"ResPartner": [{"name": "GQL-HTTP-OTHER"}]})
+
+    def test_get(self):
+        params = {
+            "query": 'query P($name: String) { ResPartner(domain: [["name", "=", $name]]) { name } }',
+            "variables": {"name": "GQL-HTTP-1"},
+        }
+        response = self.graphql_get(params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], {"ResPartner": [{"name": "GQL-HTTP-1"}]})
+        self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+        etag = response.headers["ETag"]
+        # Not sent again while it does not change
+        response = self.graphql_get(params, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        response = self.graphql_get(dict(params, variables={"name": "GQL-HTTP-2"}), headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        response = self.graphql_get({"query": 'mutation { ResPartner(vals: {name: "GQL-HTTP-GET"}) { name } }'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_introspection(self):
+        # Answered from the cache of /graphql/schema
+        response = self.graphql(get_introspection_query())
+        self.assertEqual(response, self.url_open("/graphql/schema?format=json").json())
+        types = {type_["name"] for type_ in response["data"]["__schema"]["types"]}
+        self.assertIn("ResPartner", types)
+        response = self.graphql('{ __type(name: "ResPartner") { name } }')
+        self.assertEqual(response["data"], {"__type": {"name": "ResPartner"}})
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase, tagged
+
+from ..cost import BINARY_WEIGHT, DEFAULT_MAX_LIST_SIZE, DEFAULT_X2MANY_SIZE, CostLimits
+from ..pagination import DEFAULT_PAGE_SIZE
+from ..utils import compile_document, get_cost
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestCost(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.mapping = {"ResPartner": self.env["res.partner"], "ResUsers": self.env["res.users"]}
+
+    def cost(self, query, variables={}, **limits):
+        return get_cost(compile_document(query), self.mapping, variables=variables, cost_limits=CostLimits(**limits))
+
+    def test_limits(self):
+        self.assertEqual(self.cost("{ ResPartner(limit: 3) { name } }")["requested"], 3)
+        self.assertEqual(self.cost("{ ResPartner(ids: [1, 2]) { name } }")["requested"], 2)
+        self.assertEqual(self.cost("{ ResPartnerConnection(last: 5) { nodes { name } } }")["requested"], 5)
+
+    def test_unbounded(self):
+        # Without a limit, every matching record is read
+        self.assertEqual(self.cost("{ ResPartner { name } }")["requested"], DEFAULT_MAX_LIST_SIZE)
+        self.assertEqual(self.cost("{ ResPartner { name } }", max_list_size=50)["requested"], 50)
+        self.assertEqual(self.cost("{ ResPartner { name } }", list_sizes={"res.partner": 20})["requested"], 20)
+        # A connection reads a page
+        self.assertEqual(self.cost("{ ResPartnerConnection { nodes { name } } }")["requested"], DEFAULT_PAGE_SIZE)
+
+    def test_relations(self):
+        cost = self.cost("{ ResPartner(limit: 2) { image_1920 user_id { login } child_ids { name } } }")
+        self.assertEqual(cost["requested"], 2 * BINARY_WEIGHT + 2 * 2 + 2 * (1 + DEFAULT_X2MANY_SIZE))
+        self.assertEqual(cost["depth"], 2)
+
+    def test_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.cost("{ ResPartner { name } }", max_cost=100)
+        with self.assertRaises(ValidationError):
+            self.cost("{ ResPartner(limit: 1) { child_ids { child_ids { name } } } }", max_depth=2)
+        self.assertEqual(self.cost("{ ResPartner { name } }", max_cost=0)["maximum"], 0)
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValidationError):
+            self.cost("{ ResPartner(limit: -1) { name } }")
+        with self.assertRaises(ValidationError):
+            self.cost("{ ResPartnerConnection(first: -1) { nodes { name } } }")
+        # Without limit for search, the ids are read whatever the limit
+        self.assertEqual(self.cost("{ ResPartner(limit: 0) { name } }")["requested"], DEFAULT_MAX_LIST_SIZE)
+        self.assertEqual(self.cost("{ ResPartner(ids: [1, 2, 3], limit: 1) { name } }")["requested"], 3)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import BaseCase, tagged
+
+from ..pagination import decode_cursor, encode_cursor, keyset_domain, parse_order
+
+
+def evaluate(domain, row):
+    """Return whether `row` matches `domain`, where False stands for null as in the ORM"""
+    tokens = list(domain)
+
+    def leaf(name, operator, value):
+        actual = row[name]
+        if value is False:
+            return (actual is None) == (operator == "=")
+        if actual is None:
+            return False
+        return {"=": actual == value, "!=": actual != value, ">": actual > value, "<": actual < value}[operator]
+
+    def parse():
+        token = tokens.pop(0)
+        if token in ("&", "|"):
+            first, second = parse(), parse()
+            return first and second if token == "&" else first or second
+        if token == "!":
+            return not parse()
+        return leaf(*token)
+
+    result = True
+    while tokens:  # Implicit &
+        result = parse() and result
+    return result
+
+
+def postgres_order(rows, terms):
+    """Sort the rows like Postgres: null values last in ascending order and first otherwise"""
+    rows = list(rows)
+    for name, asc in reversed(terms):
+        rows.sort(key=lambda row: (row[name] is None, row[name] or 0), reverse=not asc)
+    return rows
+
+
+MODEL = SimpleNamespace(
+    _name="test.model",
+    _fields={
+        "id": SimpleNamespace(store=True, type="integer"),
+        "name": SimpleNamespace(store=True, type="char"),
+        "sequence": SimpleNamespace(store=True, type="integer"),
+        "active": SimpleNamespace(store=True, type="boolean"),
+        "partner_id": SimpleNamespace(store=True, type="many2one"),
+        "display_name": SimpleNamespace(store=False, type="char"),
+    },
+)
+
+
+@tagged("odoo_graphql")
+class TestPagination(BaseCase):
+    def test_parse_order(self):
+        self.assertEqual(parse_order(MODEL), [("id", True)])
+        self.assertEqual(parse_order(MODEL, "name desc"), [("name", False), ("id", False)])
+        self.assertEqual(parse_order(MODEL, "name, sequence desc"), [("name", True), ("sequence", False), ("id", True)])
+        self.assertEqual(parse_order(MODEL, "id desc, name"), [("id", False)])
+        for order in ("active", "partner_id", "display_name", "unknown", "name up"):
+            with self.assertRaises(ValidationError):
+                parse_order(MODEL, order)
+
+    def test_cursor_round_trip(self):
+        values = ["Azure", None, 3]
+        self.assertEqual(decode_cursor(encode_cursor(values), [1, 2, 3]), values)
+        with self.assertRaises(ValidationError):
+            decode_cursor(encode_cursor(values), [1, 2])
+        with self.assertRaises(ValidationError):
+            decode_cursor("not a cursor", [1])
+
+    def test_keyset_domain(self):
+        names = ["b", None, "a", "b", None, "c"]
+        sequences = [1, 2, None, 1, 3, 2]
+        rows = [
+            {"id": record_id, "name": name, "sequence": sequence}
+            for record_id, (name, sequence) in enumerate(zip(names, sequences), 1)
+        ]
+        for order in ("name", "name desc", "name, sequence desc", "sequence desc, name", "id desc"):
+            terms = parse_order(MODEL, order)
+            ordered = postgres_order(rows, terms)
+            for index, row in enumerate(ordered):
+                values = [False if row[name] is None else row[name] for name, asc in terms]
+                after = [other["id"] for other in ordered if evaluate(keyset_domain(terms, values), other)]
+                self.assertEqual(after, [other["id"] for other in ordered[index + 1:]], f"after {row} by {order}")
+                before = [
+                    other["id"] for other in ordered if evaluate(keyset_domain(terms, values, reverse=True), other)
+                ]
+                self.assertEqual(before, [other["id"] for other in ordered[:index]], f"before {row} by {order}")
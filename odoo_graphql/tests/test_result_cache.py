@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import time
+from unittest.mock import patch
+
+from odoo.tests.common import BaseCase, TransactionCase, tagged
+
+from ..cache import ResultCache
+from ..models.graphql_change_log import OVERLAP
+from ..utils import compile_document, get_models
+from .common import make_env, make_field
+
+
+def make_sales_env():
+    return make_env({
+        "sale.order": [
+            make_field("name"),
+            make_field("partner_id", "many2one", "res.partner"),
+            make_field("order_line", "one2many", "sale.order.line"),
+            make_field("amount_total", "float", compute="_compute", depends=("order_line.price_total",)),
+        ],
+        "sale.order.line": [
+            make_field("price_total", "float", compute="_compute", depends=("product_id.lst_price",)),
+            make_field("product_id", "many2one", "product.product"),
+        ],
+        "res.partner": [
+            make_field("name"),
+            make_field("country_id", "many2one", "res.country"),
+            make_field("country_code", compute="_related", depends=("country_id.code",)),
+        ],
+        "product.product": [make_field("lst_price", "float")],
+        "res.country": [make_field("code")],
+    })
+
+
+@tagged("odoo_graphql")
+class TestResultCache(BaseCase):
+    def test_tags(self):
+        cache = ResultCache(max_bytes=100, ttl=60)
+        cache.set("a", b"12345", tags=["res.partner"])
+        cache.set("b", b"12345", tags=["sale.order", "res.partner"])
+        cache.set("c", b"12345", tags=["sale.order"])
+        cache.invalidate(["res.partner"])
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (None, None, b"12345"))
+        self.assertEqual(cache.stats()["invalidations"], 2)
+        self.assertEqual(cache.bytes, 5)
+
+    def test_budget_and_expiry(self):
+        cache = ResultCache(max_bytes=10, ttl=60)
+        cache.set("a", b"123456")
+        cache.set("b", b"123456")  # The oldest entry is evicted
+        cache.set("c", b"12345678901")  # Larger than the budget, not stored
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (None, b"123456", None))
+        with patch.object(time, "monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.bytes, 0)
+
+    def test_models(self):
+        env = make_sales_env()
+        mapping = {"SaleOrder": env["sale.order"], "ResPartner": env["res.partner"]}
+        models = get_models(compile_document("{ SaleOrder { name partner_id { name } } }"), mapping)
+        self.assertEqual(models, {"sale.order", "res.partner"})
+        # Without subfields, the display name of the partner is read
+        models = get_models(compile_document("{ SaleOrder { partner_id } }"), mapping)
+        self.assertEqual(models, {"sale.order", "res.partner"})
+        # Computed fields depend on other models, also through other computed fields
+        models = get_models(compile_document("{ SaleOrder { amount_total } }"), mapping)
+        self.assertEqual(models, {"sale.order", "sale.order.line", "product.product"})
+        models = get_models(compile_document("{ ResPartnerConnection { nodes { country_code } } }"), mapping)
+        self.assertEqual(models, {"res.partner", "res.country"})
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestChangeLog(TransactionCase):
+    def test_gaps(self):
+        log = self.env["graphql.change.log"].sudo()
+        last_id = log._last_id()
+        self.env.cr.execute(
+            "INSERT INTO graphql_change_log (id, model, date) VALUES (%s, 'res.partner', now()), (%s, 'res.users', now())",
+            (last_id + 1, last_id + 4),
+        )
+        # Ids 2 and 3 may still be committed by running transactions
+        new_last_id, gaps, models = log._changes(last_id)
+        self.assertEqual((new_last_id, gaps, models), (last_id + 4, {last_id + 2, last_id + 3}, {"res.partner", "res.users"}))
+        self.env.cr.execute(
+            "INSERT INTO graphql_change_log (id, model, date) VALUES (%s, 'sale.order', now())", (last_id + 3,)
+        )
+        self.assertEqual(log._changes(new_last_id, gaps), (last_id + 4, {last_id + 2}, {"sale.order"}))
+        self.assertEqual(log._changes(new_last_id, {last_id + 2}), (last_id + 4, {last_id + 2}, set()))
+        # Forgotten once OVERLAP higher ids are read
+        self.env.cr.execute(
+            "INSERT INTO graphql_change_log (id, model, date) VALUES (%s, 'res.partner', now())",
+            (last_id + 2 + OVERLAP,),
+        )
+        self.assertNotIn(last_id + 2, log._changes(new_last_id, {last_id + 2})[1])
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestHandlerResultCache(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.env["ir.config_parameter"].sudo().set_param("graphql.result_cache_size", 1024 * 1024)
+        self.partner = self.env["res.partner"].create({"name": "GQL-RESULT-CACHE"})
+        self.handler = self.env["graphql.handler"]
+
+    def test_cached(self):
+        query = "query P($ids: [Int]) { ResPartner(ids: $ids) { name } }"
+        variables = {"ids": [self.partner.id]}
+        response, body = self.handler._get_response(query, variables)
+        self.assertEqual(response["data"]["ResPartner"], [{"name": "GQL-RESULT-CACHE"}])
+        # Sent again as stored
+        self.assertEqual(self.handler._get_response(query, variables), (None, body))
+        # Not while the transaction modified the models it was read from
+        self.partner.name = "GQL-RESULT-CACHE-2"
+        response, body = self.handler._get_response(query, variables)
+        self.assertEqual(response["data"]["ResPartner"], [{"name": "GQL-RESULT-CACHE-2"}])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import decimal
+import importlib.util
+import sys
+from unittest.mock import patch
+
+from odoo.tests.common import BaseCase, TransactionCase, tagged
+
+from .. import serialization
+from ..serialization import default, dumps, loads
+
+
+def load_without_orjson():
+    """Return a copy of the serialization module using the standard library"""
+    spec = importlib.util.spec_from_file_location("serialization_without_orjson", serialization.__file__)
+    module = importlib.util.module_from_spec(spec)
+    with patch.dict(sys.modules, {"orjson": None}):
+        spec.loader.exec_module(module)
+    return module
+
+
+@tagged("odoo_graphql")
+class TestSerialization(BaseCase):
+    def test_odoo_values(self):
+        value = {
+            "write_date": datetime.datetime(2024, 1, 31, 12, 0, 0),
+            "date": datetime.date(2024, 1, 31),
+            "amount": decimal.Decimal("1.5"),
+            "image": b"iVBORw0KGgo=",
+            "tags": {3},
+            "name": "Café",
+            1: None,
+        }
+        self.assertEqual(loads(dumps(value)), {
+            "write_date": "2024-01-31 12:00:00",
+            "date": "2024-01-31",
+            "amount": 1.5,
+            "image": "iVBORw0KGgo=",
+            "tags": [3],
+            "name": "Café",
+            "1": None,
+        })
+
+    def test_compact_utf8(self):
+        self.assertEqual(dumps({"name": "Café", "ids": [1, 2]}), '{"name":"Café","ids":[1,2]}'.encode())
+
+    def test_default(self):
+        self.assertEqual(default(datetime.datetime(2024, 1, 31, 12, 0, 0, 5)), "2024-01-31 12:00:00.000005")
+        self.assertEqual(default(1j), "1j")
+
+    def test_standard_library(self):
+        # Same encoding whether orjson is installed or not
+        module = load_without_orjson()
+        self.assertIsNone(module.orjson)
+        value = {"date": datetime.date(2024, 1, 31), "amount": decimal.Decimal("2"), "name": "Café", "ids": [1]}
+        self.assertEqual(module.dumps(value), dumps(value))
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestSerializationRecords(TransactionCase):
+    def test_records(self):
+        parent = self.env["res.partner"].create({"name": "GQL-JSON"})
+        partner = self.env["res.partner"].create({"name": "GQL-JSON-CHILD", "parent_id": parent.id})
+        self.assertEqual(loads(dumps({"partners": parent | partner})), {"partners": [parent.id, partner.id]})
+        row = partner.read(["name", "parent_id", "write_date"])[0]
+        self.assertEqual(loads(dumps(row)), {
+            "id": partner.id,
+            "name": "GQL-JSON-CHILD",
+            "parent_id": [parent.id, parent.display_name],
+            "write_date": str(partner.write_date),
+        })
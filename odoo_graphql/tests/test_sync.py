@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests.common import BaseCase, tagged
+
+from ..pagination import encode_cursor
+from ..sync import decode_watermark, encode_watermark, settle
+
+
+@tagged("odoo_graphql")
+class TestSync(BaseCase):
+    def test_watermark_round_trip(self):
+        # Dates of the unlink log come from now() and have microseconds
+        now = fields.Datetime.now()
+        records_position = [now.replace(microsecond=123456), 42]
+        deleted_position = [now.replace(microsecond=7), 3]
+        watermark = encode_watermark(records_position, deleted_position)
+        self.assertEqual(decode_watermark(watermark), (records_position, deleted_position))
+
+    def test_watermark_without_microseconds(self):
+        now = fields.Datetime.now().replace(microsecond=0)
+        watermark = encode_cursor([str(now), 1, str(now), 2])
+        self.assertEqual(decode_watermark(watermark), ([now, 1], [now, 2]))
+
+    def test_watermark_invalid(self):
+        with self.assertRaises(ValidationError):
+            decode_watermark(encode_cursor(["yesterday", 1, "today", 2]))
+
+    def test_watermark_expired(self):
+        old = fields.Datetime.now() - timedelta(days=31)
+        with self.assertRaises(ValidationError):
+            decode_watermark(encode_watermark([old, 1], [old, 1]))
+
+    def test_settle(self):
+        cutoff = datetime(2024, 1, 31, 12, 0, 0, 500)
+        before = [datetime(2024, 1, 31, 12, 0, 0, 499), 7]
+        self.assertEqual(settle(before, cutoff), before)
+        self.assertEqual(settle([cutoff, 7], cutoff), [cutoff, 0])
+        self.assertEqual(settle(None, cutoff), [cutoff, 0])
+        # A position decoded from a watermark can be settled again
+        decoded, _ = decode_watermark(encode_watermark(before, [fields.Datetime.now(), 0]))
+        self.assertEqual(settle(decoded, cutoff), before)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..utils import upsert_records
+
+
+@tagged("post_install", "-at_install", "odoo_graphql")
+class TestUpsert(TransactionCase):
+    def test_date_key(self):
+        # Sent as a string, read back as a date
+        Partner = self.env["res.partner"]
+        partner = Partner.create({"name": "Before", "date": date(2024, 1, 31), "ref": "GQL-UPSERT"})
+        records = upsert_records(
+            Partner,
+            [
+                {"name": "Updated", "date": "2024-01-31", "ref": "GQL-UPSERT"},
+                {"name": "Created", "date": "2024-02-01", "ref": "GQL-UPSERT"},
+            ],
+            ["date", "ref"],
+        )
+        self.assertEqual(records[0], partner)
+        self.assertEqual(partner.name, "Updated")
+        self.assertNotEqual(records[1], partner)
+        self.assertEqual(records[1].date, date(2024, 2, 1))
+
+    def test_empty_key(self):
+        # None and False both stand for an empty value
+        Partner = self.env["res.partner"].with_context(active_test=False)
+        partner = Partner.create({"name": "GQL-UPSERT-EMPTY"})
+        records = upsert_records(Partner, [{"name": "GQL-UPSERT-EMPTY", "ref": None}], ["name", "ref"])
+        self.assertEqual(records, partner)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# Tracing of the execution of a query, in the format of Apollo tracing
+# https://github.com/apollographql/apollo-tracing
+import time
+from datetime import datetime, timezone
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class Tracer(object):
+    """Collect the timings, SQL queries and rows read for each path
+
+    Relations of a same depth are read together: the paths of a depth share
+    the timings and SQL queries of their reads.
+    """
+
+    def __init__(self, cr=None, requested=True, sampled=False):
+        self.cr = cr
+        self.requested = requested  # Sent back in the response
+        self.sampled = sampled  # Written to the log
+        self.resolvers = []
+        self._start = time.time()
+        self._counter = time.perf_counter()
+
+    def _sql_count(self):
+        return getattr(self.cr, "sql_log_count", 0)
+
+    def start(self):
+        """Return the state to give to `stop` when the traced work is over"""
+        return time.perf_counter(), self._sql_count()
+
+    def stop(self, state, path, parent_type, return_type, rows=0):
+        start, sql_count = state
+        self.resolvers.append({
+            "path": list(path),
+            "parentType": parent_type,
+            "fieldName": path[-1],
+            "returnType": return_type,
+            "startOffset": int((start - self._counter) * 1e9),
+            "duration": int((time.perf_counter() - start) * 1e9),
+            "sqlQueries": self._sql_count() - sql_count,
+            "rows": rows,
+        })
+
+    def result(self):
+        end = time.time()
+        return {
+            "version": 1,
+            "startTime": _isoformat(self._start),
+            "endTime": _isoformat(end),
+            "duration": int((time.perf_counter() - self._counter) * 1e9),
+            "execution": {"resolvers": self.resolvers},
+        }
@@ -1,83 +1,468 @@
 # -*- coding: utf-8 -*-
 
 # https://github.com/graphql-python/graphql-core
-from graphql import parse
-from odoo.http import request
+import hashlib
+from collections import defaultdict, namedtuple
+from collections.abc import Mapping
+
+from graphql import parse, print_ast
 from odoo.exceptions import ValidationError
 from odoo.osv.expression import AND
 from graphql.language.ast import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    OperationDefinitionNode,
     VariableNode,
     ValueNode,
     ObjectValueNode,
     ListValueNode,
     IntValueNode,
     FloatValueNode,
+    NullValueNode,
+)
+from .aggregate import AGGREGATE_SUFFIX, aggregate_specs, parse_groupby
+from .binary import DEFAULT_MAX_INLINE_BYTES, resolve_binary
+from .cache import LRUCache
+from .concurrency import export_snapshot, resolve_concurrently
+from .cost import check_cost
+from .serialization import dumps
+from .pagination import (
+    CONNECTION_SUFFIX,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    connection_nodes,
+    decode_cursor,
+    encode_cursor,
+    estimate_count,
+    keyset_domain,
+    order2str,
+    parse_order,
+)
+from .sync import (
+    SYNC_SUFFIX,
+    after_domain,
+    decode_watermark,
+    encode_watermark,
+    settle,
+    sync_cutoff,
+    sync_records,
 )
-from odoo.osv import expression
 # import traceback
 
+import json
 import logging
 
 _logger = logging.getLogger(__name__)
-_logger.setLevel(logging.INFO)
+
+DOCUMENT_CACHE_SIZE = 256
+PLAN_CACHE_SIZE = 512
+STREAM_CHUNK_SIZE = 1000
+
+# A compiled operation: fragments are inlined and @include/@skip already
+# evaluated, so executing it does not need to walk the AST anymore.
+Plan = namedtuple("Plan", ["operation", "name", "fields"])
+PlanField = namedtuple("PlanField", ["name", "alias", "arguments", "fields"])
+
+# sha256 -> (DocumentNode, names of the variables used by directives)
+_document_cache = LRUCache(DOCUMENT_CACHE_SIZE)
+# (sha256, operation, directive variables truthiness) -> Plan
+_plan_cache = LRUCache(PLAN_CACHE_SIZE)
 
 
 def model2name(model):
-    _logger.info(f"Converting model {model} to name")
     return "".join(p.title() for p in model.split("."))
 
 
-def filter_by_directives(node, variables={}):
-    _logger.info(f"Filtering directives for node {node}")
-    if not node.selection_set:
-        return
-    selections = []
-    for field in node.selection_set.selections:
-        if parse_directives(field.directives, variables=variables):
-            selections.append(field)
-            filter_by_directives(field, variables=variables)
-    node.selection_set.selections = selections
+class ModelMapping(Mapping):
+    """Read-only mapping of the GraphQL names to the models
+
+    Models are only instantiated when they are accessed.
+    """
+
+    def __init__(self, env, names):
+        self.env = env
+        self.names = names
+
+    def __getitem__(self, key):
+        return self.env[self.names[key]]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def with_env(self, env):
+        return ModelMapping(env, self.names)
 
 
 def get_definition(doc, operation=None):
-    _logger.info(f"Getting definition for operation {operation}")
-    if operation is None or len(doc.definitions) == 1:
-        return doc.definitions[0]
-    for definition in doc.definitions:
+    definitions = [d for d in doc.definitions if isinstance(d, OperationDefinitionNode)]
+    if operation is None or len(definitions) == 1:
+        return definitions[0]
+    for definition in definitions:
         # https://dgraph.io/docs/graphql/api/multiples/#multiple-operations
         # https://github.com/graphql/graphql-spec/issues/29
-        if definition.name.value == operation:
+        if definition.name and definition.name.value == operation:
             return definition
-    return doc.definitions[0]  # Or raise an Exception?
+    return definitions[0]  # Or raise an Exception?
+
+
+def get_fragments(doc):
+    return {
+        d.name.value: d
+        for d in doc.definitions
+        if isinstance(d, FragmentDefinitionNode)
+    }
+
+
+def get_directive_variables(doc):
+    """Return the sorted names of the variables used by @include/@skip"""
+    names = set()
+
+    def walk(selection_set):
+        if not selection_set:
+            return
+        for selection in selection_set.selections:
+            for d in selection.directives or ():
+                if d.name.value not in ("include", "skip"):
+                    continue
+                for arg in d.arguments or ():
+                    if isinstance(arg.value, VariableNode):
+                        names.add(arg.value.name.value)
+            walk(getattr(selection, "selection_set", None))
+
+    for definition in doc.definitions:
+        walk(definition.selection_set)
+    return tuple(sorted(names))
+
+
+def compile_selections(selection_set, fragments, variables={}, visited=()):
+    if not selection_set:
+        return ()
+    fields = []
+    for selection in selection_set.selections:
+        if not parse_directives(selection.directives or (), variables=variables):
+            continue
+        if isinstance(selection, FieldNode):
+            fields.append(PlanField(
+                name=selection.name.value,
+                alias=selection.alias.value if selection.alias else None,
+                arguments=tuple((a.name.value, a.value) for a in selection.arguments or ()),
+                fields=compile_selections(
+                    selection.selection_set, fragments, variables=variables, visited=visited
+                ),
+            ))
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            if name in visited:
+                raise ValidationError(f"Fragment {name} spreads itself")
+            fragment = fragments.get(name)
+            if fragment is None:
+                raise ValidationError(f"Fragment {name} not found in document")
+            fields.extend(compile_selections(
+                fragment.selection_set, fragments, variables=variables, visited=visited + (name,)
+            ))
+        elif isinstance(selection, InlineFragmentNode):
+            fields.extend(compile_selections(
+                selection.selection_set, fragments, variables=variables, visited=visited
+            ))
+    return merge_fields(fields)
+
+
+def merge_fields(fields):
+    """Merge the fields selected more than once with the same response key
+
+    e.g. `user_id { name } user_id { login }` is read as `user_id { name login }`,
+    so that the relation is only resolved once.
+    """
+    merged = {}
+    for field in fields:
+        key = field.alias or field.name
+        other = merged.get(key)
+        if other is None:
+            merged[key] = field
+        elif field.fields:
+            merged[key] = other._replace(fields=merge_fields(other.fields + field.fields))
+    return tuple(merged.values())
+
+
+def build_plan(doc, variables={}, operation=None):
+    definition = get_definition(doc, operation=operation)
+    return Plan(
+        operation=definition.operation.value,
+        name=definition.name.value if definition.name else None,
+        fields=compile_selections(definition.selection_set, get_fragments(doc), variables=variables),
+    )
+
+
+def _get_parsed(doc):
+    key = hashlib.sha256(doc.encode()).hexdigest()
+    parsed = _document_cache.get(key)
+    if parsed is None:
+        document = parse(doc)
+        # Identifies the document whatever its formatting and comments
+        normalized = hashlib.sha256(print_ast(document).encode()).hexdigest()
+        parsed = (document, get_directive_variables(document), normalized)
+        _document_cache[key] = parsed
+    return (key,) + parsed
+
+
+def get_document(doc):
+    """Return the parsed document, shared with the plans cache"""
+    return _get_parsed(doc)[1]
+
+
+def get_document_key(doc):
+    """Return a hash of the document which does not depend on its formatting"""
+    return _get_parsed(doc)[3]
+
+
+def compile_document(doc, variables={}, operation=None):
+    """Return the Plan of `operation`, reusing the cached one when possible.
+
+    Plans only depend on the document, the operation and the truthiness of
+    the variables used by directives, which is what they are keyed on.
+    Documents that are already parsed are compiled without being cached.
+    """
+    if not isinstance(doc, str):
+        return build_plan(doc, variables=variables, operation=operation)
+
+    key, document, directive_variables, normalized = _get_parsed(doc)
+
+    shape = tuple(bool(variables.get(name)) for name in directive_variables)
+    plan_key = (key, operation, shape)
+    plan = _plan_cache.get(plan_key)
+    if plan is None:
+        plan = build_plan(document, variables=variables, operation=operation)
+        _plan_cache[plan_key] = plan
+    return plan
 
 
-def handle_graphql(doc, model_mapping, variables={}, operation=None, allowed_fields={},company_id=None):
-    _logger.info (company_id)
-    _logger.info(f"Handling GraphQL request with operation {operation} and variables {variables}")
+def is_introspection(doc, variables={}, operation=None):
+    """Return whether the operation only selects introspection fields, e.g. __schema"""
+    try:
+        plan = compile_document(doc, variables=variables, operation=operation)
+    except Exception:  # Reported when handling the document
+        return False
+    return bool(plan.fields) and all(field.name.startswith("__") for field in plan.fields)
+
+
+def plan_cache_stats():
+    return {
+        "documents": _document_cache.stats(),
+        "plans": _plan_cache.stats(),
+    }
+
+
+def clear_plan_cache():
+    _document_cache.clear()
+    _plan_cache.clear()
+
+
+def handle_graphql(
+    doc,
+    model_mapping,
+    variables={},
+    operation=None,
+    allowed_fields={},
+    company_id=None,
+    cost_limits=None,
+    tracer=None,
+    workers=0,
+):
     response = {}
     try:
-        data = parse_document(
-            doc,
+        definition = compile_document(doc, variables=variables, operation=operation)
+        if cost_limits is not None:  # Rejected before reading anything
+            response["extensions"] = {
+                "cost": get_cost(definition, model_mapping, variables=variables, cost_limits=cost_limits)
+            }
+        data = parse_definition(
+            definition,
             model_mapping,
             variables=variables,
-            operation=operation,
             allowed_fields=allowed_fields,
             company_id=company_id,
+            tracer=tracer,
+            max_inline_bytes=cost_limits.max_inline_bytes if cost_limits else DEFAULT_MAX_INLINE_BYTES,
+            workers=workers,
         )
         response["data"] = data
     except Exception as e:
-        _logger.info(f"Error while handling GraphQL request: {e}")
-        _logger.critical(e)
+        _logger.warning("Error while handling GraphQL request: %s", e)
         response["data"] = None
         response["errors"] = {"message": str(e)}  # + traceback.format_exc()
     return response
-def parse_document(doc, model_mapping, variables={}, operation=None, allowed_fields={}, company_id=None):
-    _logger.info(f"Parsing document with operation {operation} and variables {variables}")
-    if isinstance(doc, str):
-        doc = parse(doc)
 
+
+def get_cost(definition, model_mapping, variables={}, cost_limits=None):
+    """Return the cost of a plan, raise if it exceeds `cost_limits`"""
+    arguments = [parse_arguments(field.arguments, variables=variables) for field in definition.fields]
+    return check_cost(definition, model_mapping, arguments, cost_limits)
+
+
+def field_depends(model, model_field):
+    """Return the dotted paths of the fields a computed field depends on"""
+    registry = getattr(model, "pool", None)
+    if registry is not None and hasattr(registry, "field_depends"):  # Odoo >= 15
+        return registry.field_depends[model_field]
+    return getattr(model_field, "depends", None) or ()
+
+
+def get_models(definition, model_mapping):
+    """Return the names of the models read by a plan
+
+    Along with the models of the selected relations, the models that the
+    computed and related fields depend on are included, since their values
+    change when these models do.
+    """
+    names = set()
+    visited = set()
+
+    def depend(model, model_field):
+        if not model_field.compute or (model._name, model_field.name) in visited:
+            return
+        visited.add((model._name, model_field.name))
+        for path in field_depends(model, model_field):
+            current = model
+            for name in path.split("."):
+                dependency = current._fields.get(name)
+                if dependency is None:
+                    break
+                depend(current, dependency)
+                if not dependency.relational:
+                    break
+                current = current.env[dependency.comodel_name]
+                names.add(current._name)
+
+    def walk(model, fields):
+        names.add(model._name)
+        for field in fields:
+            model_field = model._fields.get(field.name)
+            if model_field is None:
+                continue
+            depend(model, model_field)
+            if model_field.relational:
+                if field.fields:
+                    walk(model.env[model_field.comodel_name], field.fields)
+                else:  # e.g. the display name of a many2one
+                    names.add(model_field.comodel_name)
+
+    for field in definition.fields:
+        model = model_mapping.get(field.name)
+        fields = field.fields
+        if model is None and field.name.endswith(CONNECTION_SUFFIX):
+            model = model_mapping.get(field.name[:-len(CONNECTION_SUFFIX)])
+            fields = connection_nodes(fields)
+        elif model is None and field.name.endswith(AGGREGATE_SUFFIX):
+            model = model_mapping.get(field.name[:-len(AGGREGATE_SUFFIX)])
+        elif model is None and field.name.endswith(SYNC_SUFFIX):
+            model = model_mapping.get(field.name[:-len(SYNC_SUFFIX)])
+            fields = sync_records(fields)
+        if model is not None:
+            walk(model, fields)
+    return names
+
+
+def stream_graphql(
+    doc,
+    model_mapping,
+    variables={},
+    operation=None,
+    allowed_fields={},
+    company_id=None,
+    chunk_size=STREAM_CHUNK_SIZE,
+    cost_limits=None,
+):
+    """Generate the JSON response of a query piece by piece, as bytes
+
+    The records of the root fields are read `chunk_size` at a time and the
+    cache of the environment is emptied after each chunk, so that the memory
+    used does not depend on the number of records returned.
+    """
+    yield b'{"data":{'
+    try:
+        definition = compile_document(doc, variables=variables, operation=operation)
+        if definition.operation == "mutation":
+            raise ValidationError("Mutations can not be streamed")
+        if cost_limits is not None:
+            get_cost(definition, model_mapping, variables=variables, cost_limits=cost_limits)
+        loader = BatchLoader(
+            max_inline_bytes=cost_limits.max_inline_bytes if cost_limits else DEFAULT_MAX_INLINE_BYTES
+        )
+        separator = b""
+        for field in definition.fields:
+            # The key is only sent along with the beginning of its value
+            prefix = separator + dumps(field.alias or field.name) + b":"
+            for piece in stream_model_field(
+                field,
+                model_mapping,
+                variables=variables,
+                allowed_fields=allowed_fields,
+                company_id=company_id,
+                chunk_size=chunk_size,
+                loader=loader,
+            ):
+                yield prefix + piece
+                prefix = b""
+            separator = b","
+    except Exception as e:
+        _logger.warning("Error while streaming GraphQL request: %s", e)
+        # The data already sent is kept, as for any partial response
+        yield b'},"errors":' + dumps({"message": str(e)}) + b"}"
+        return
+    yield b"}}"
+
+
+def stream_model_field(
+    field, model_mapping, variables={}, allowed_fields={}, company_id=None, chunk_size=STREAM_CHUNK_SIZE, loader=None
+):
+    if loader is None:
+        loader = BatchLoader()
+    model = model_mapping.get(field.name)
+    if model is None:  # e.g. a connection, whose size is already bounded
+        yield dumps(parse_model_field(
+            field, model_mapping, variables=variables, allowed_fields=allowed_fields, company_id=company_id, loader=loader
+        ))
+        return
+    if company_id:
+        model = model.with_company(company_id)
+    arguments = parse_arguments(field.arguments, variables=variables)
+    ids = retrieve_records(model, arguments).ids
+
+    yield b"["
+    separator = b""
+    try:
+        for start in range(0, len(ids), chunk_size):
+            records = model.browse(ids[start:start + chunk_size])
+            values = parse_fields(
+                records, field.fields, variables=variables, allowed_fields=allowed_fields, loader=loader
+            )
+            if values:  # The chunk is encoded at once, without its brackets
+                yield separator + dumps(values)[1:-1]
+                separator = b","
+            del records, values
+            loader.clear()
+            invalidate_cache(model.env)
+    except Exception:
+        yield b"]"  # Keep the response valid
+        raise
+    yield b"]"
+
+
+def invalidate_cache(env):
+    if hasattr(env, "invalidate_all"):  # Odoo 16+
+        env.invalidate_all()
+    else:
+        env["base"].invalidate_cache()
+
+
+def parse_document(doc, model_mapping, variables={}, operation=None, allowed_fields={}, company_id=None):
     # A document can have many definitions
-    definition = get_definition(doc, operation=operation)
+    definition = compile_document(doc, variables=variables, operation=operation)
     return parse_definition(
         definition, model_mapping, variables=variables, allowed_fields=allowed_fields, company_id=company_id
     )
@@ -87,21 +472,20 @@ def parse_directives(directives, variables={}):
     """Currently return True to keep, False to skip"""
     for d in directives:
         if d.name.value == "include":
-            for arg in d.arguments:
+            for arg in d.arguments or ():
                 if arg.name.value == "if":
                     value = value2py(arg.value, variables=variables)
                     return value
         elif d.name.value == "skip":
-            for arg in d.arguments:
+            for arg in d.arguments or ():
                 if arg.name.value == "if":
                     value = value2py(arg.value, variables=variables)
                     return not value
     return True  # Keep everything else
 
 def value2py(value, variables={}):
-    _logger.info(f"Converting value {value} to Python with variables {variables}")
     if isinstance(value, VariableNode):
-        return variables[value.name.value]
+        return variables.get(value.name.value)
     if isinstance(value, ValueNode):
         if isinstance(value, ObjectValueNode):
             return {f.name.value: value2py(f.value, variables=variables) for f in value.fields}
@@ -111,43 +495,608 @@ def value2py(value, variables={}):
             return int(value.value)
         elif isinstance(value, FloatValueNode):
             return float(value.value)
+        elif isinstance(value, NullValueNode):
+            return None
         else:
             return value.value
     raise ValueError(f"Unknown value type: {value}")
 
-def parse_definition(definition, model_mapping, variables={}, allowed_fields={}, company_id=None):
-    _logger.info(f"Parsing definition with variables {variables}")
-    filter_by_directives(definition, variables=variables)
-    model = model_mapping[definition.name.value]
-    fields = parse_fields(definition, model_mapping, variables=variables, allowed_fields=allowed_fields, company_id=company_id)
-    return {definition.name.value: fields}
-def filter_by_directives(node, variables={}):
-    """Filter fields and fragment spreads by directives"""
-    node.selection_set.selections = [
-        s for s in node.selection_set.selections if parse_directives(s.directives, variables=variables)
-    ]
 
+def parse_arguments(arguments, variables={}):
+    return {name: value2py(value, variables=variables) for name, value in arguments}
 
-def parse_fields(definition, model_mapping, variables={}, allowed_fields={}, company_id=None):
-    _logger.info(f"Parsing fields for {definition.name.value} with variables {variables}")
-    model = model_mapping[definition.name.value]
-    fields = {}
-    for field in definition.selection_set.selections:
-        if isinstance(field, FieldNode):
-            if field.name.value in allowed_fields:
-                if field.name.value in model:
-                    value = model[field.name.value]
-                    if callable(value):
-                        value = value(company_id=company_id)
-                    fields[field.name.value] = value
-                else:
-                    _logger.error(f"Field {field.name.value} not found in model {definition.name.value}")
+
+def retrieve_records(model, arguments, mutation=False):
+    domain = arguments.get("domain")
+    ids = arguments.get("ids")
+    if ids is not None and not isinstance(ids, list):
+        ids = [ids]
+    if mutation:
+        vals = arguments.get("vals") or {}
+        if arguments.get("upsert"):
+            return upsert_records(model, vals, arguments["upsert"])
+        if isinstance(vals, list):  # Created with a single call
+            if domain is not None or ids:
+                raise ValidationError("A list of vals can only be created or upserted")
+            return model.create(vals)
+        # No domain means a creation, an empty domain a write on all records
+        if domain is None and not ids:
+            return model.create(vals)
+        records = model.browse(ids) if ids else model.search(domain)
+        records.write(vals)
+        return records
+    if ids:
+        records = model.browse(ids).exists()
+        if domain:
+            records = records.filtered_domain(domain)
+        return records
+    return model.search(
+        domain or [],
+        limit=arguments.get("limit"),
+        offset=arguments.get("offset") or 0,
+        order=arguments.get("order"),
+    )
+
+
+def _key_value(model, name, value):
+    """Return `value` of the field `name` as `search_read` returns it, e.g. a date for '2024-01-31'"""
+    field = model._fields[name]
+    value = field.convert_to_record(field.convert_to_cache(value, model), model)
+    return field.convert_to_read(value, model, False)
+
+
+def upsert_records(model, vals_list, keys):
+    """Create or update the records identified by the values of the `keys` fields
+
+    The existing records are found with a single search. The missing ones are
+    created with a single `create` and the existing ones are written once per
+    distinct values. Return the records in the order of `vals_list`.
+    """
+    if isinstance(vals_list, dict):
+        vals_list = [vals_list]
+    if isinstance(keys, str):
+        keys = [keys]
+    for name in keys:
+        if name not in model._fields:
+            raise ValidationError(f"Field {name} not found in model {model._name}")
+    wanted = []
+    for vals in vals_list:
+        if any(name not in vals for name in keys):
+            raise ValidationError(f"Upserted values must contain {', '.join(keys)}")
+        wanted.append(tuple(_key_value(model, name, vals[name]) for name in keys))
+    if len(set(wanted)) != len(wanted):
+        raise ValidationError("Upserted values must have distinct keys")
+
+    domain = [(name, "in", list({key[i] for key in wanted})) for i, name in enumerate(keys)]
+    existing = {
+        tuple(_key_value(model, name, row[name]) for name in keys): row["id"]
+        for row in model.search_read(domain, list(keys), load=None)
+    }
+
+    created = iter(model.create([vals for vals, key in zip(vals_list, wanted) if key not in existing]))
+    writes = {}
+    for vals, key in zip(vals_list, wanted):
+        if key in existing:
+            signature = json.dumps(vals, sort_keys=True, default=str)
+            writes.setdefault(signature, (vals, []))[1].append(existing[key])
+    for vals, ids in writes.values():
+        model.browse(ids).write(vals)
+    return model.browse([existing[key] if key in existing else next(created).id for key in wanted])
+
+
+class BatchLoader(object):
+    """Per-request batching of the ORM reads
+
+    The ids requested at a given depth for the same model, columns and
+    companies are read with a single `read`, whatever the number of parent
+    records they come from. Rows are kept for the rest of the request.
+    """
+
+    def __init__(self, tracer=None, max_inline_bytes=DEFAULT_MAX_INLINE_BYTES):
+        self.reads = defaultdict(int)  # depth -> number of reads
+        self.tracer = tracer
+        # Binary content inlined in the response, see resolve_binary
+        self.max_inline_bytes = max_inline_bytes
+        self.inline_bytes = 0
+        self._rows = {}
+
+    def clear(self):
+        """Forget the rows read, e.g. when they may have been modified"""
+        self._rows = {}
+
+    def _key(self, records, columns):
+        companies = records.env.context.get("allowed_company_ids") or ()
+        return (records._name, columns, tuple(companies))
+
+    def read(self, requests, depth=0):
+        """Return, for each (records, columns) request, its rows by id"""
+        keys = [self._key(records, columns) for records, columns in requests]
+        missing = {}
+        for key, (records, columns) in zip(keys, requests):
+            cache = self._rows.setdefault(key, {})
+            ids = [i for i in records.ids if i not in cache]
+            if ids:
+                missing.setdefault(key, (records, set()))[1].update(ids)
+        for key, (records, ids) in missing.items():
+            columns = list(key[1]) or ["id"]
+            for row in records.browse(list(ids)).read(columns, load=None):
+                self._rows[key][row["id"]] = row
+            self.reads[depth] += 1
+        return [self._rows[key] for key in keys]
+
+    def prime(self, records, columns, rows):
+        """Register rows already read, e.g. along with a `search_read`"""
+        cache = self._rows.setdefault(self._key(records, columns), {})
+        for row in rows:
+            cache[row["id"]] = row
+
+
+def parse_definition(
+    definition,
+    model_mapping,
+    variables={},
+    allowed_fields={},
+    company_id=None,
+    tracer=None,
+    max_inline_bytes=DEFAULT_MAX_INLINE_BYTES,
+    workers=0,
+):
+    mutation = definition.operation == "mutation"
+    parent_type = "Mutation" if mutation else "Query"
+    snapshot = None
+    if (
+        workers > 1
+        and not mutation
+        and tracer is None  # Traces count the queries of the cursor of the request
+        and len(definition.fields) > 1
+        and isinstance(model_mapping, ModelMapping)
+    ):
+        # None when the transaction modified the database, the other cursors would not see it
+        snapshot = export_snapshot(model_mapping.env.cr)
+    if snapshot is not None:
+        return parse_definition_concurrently(
+            definition,
+            model_mapping,
+            variables=variables,
+            allowed_fields=allowed_fields,
+            company_id=company_id,
+            max_inline_bytes=max_inline_bytes,
+            workers=workers,
+            snapshot=snapshot,
+        )
+    loader = BatchLoader(tracer=tracer, max_inline_bytes=max_inline_bytes)
+    # Root fields are resolved in document order, mutations must stay sequential
+    data = {}
+    for field in definition.fields:
+        if mutation:  # Rows read before a mutation may be outdated
+            loader.clear()
+        key = field.alias or field.name
+        state = tracer.start() if tracer else None
+        data[key] = parse_model_field(
+            field,
+            model_mapping,
+            variables=variables,
+            mutation=mutation,
+            allowed_fields=allowed_fields,
+            company_id=company_id,
+            loader=loader,
+        )
+        if tracer:
+            if isinstance(data[key], list):
+                tracer.stop(state, (key,), parent_type, f"[{field.name}]", rows=len(data[key]))
             else:
-                _logger.warning(f"Field {field.name.value} not allowed in model {definition.name.value}")
-        elif isinstance(field, FragmentSpreadNode):
-            fragment = get_fragment(doc, field.name.value)
-            if fragment:
-                fields.update(parse_fields(fragment, model_mapping, variables=variables, allowed_fields=allowed_fields, company_id=company_id))
+                tracer.stop(state, (key,), parent_type, field.name, rows=1)
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Reads per depth for %s: %s", field.name, dict(loader.reads))
+    return data
+
+
+def parse_definition_concurrently(
+    definition,
+    model_mapping,
+    variables={},
+    allowed_fields={},
+    company_id=None,
+    max_inline_bytes=DEFAULT_MAX_INLINE_BYTES,
+    workers=2,
+    snapshot=None,
+):
+    """Resolve the root fields of a query on a pool of `workers` threads
+
+    Each root field has its own cursor and loader, importing the `snapshot`
+    of the request. The limit of inlined binary content is shared equally
+    between them.
+    """
+    budget = max_inline_bytes // len(definition.fields)
+
+    def task(field):
+        def resolve(env):
+            return parse_model_field(
+                field,
+                model_mapping.with_env(env),
+                variables=variables,
+                allowed_fields=allowed_fields,
+                company_id=company_id,
+                loader=BatchLoader(max_inline_bytes=budget),
+            )
+        return resolve
+
+    values = resolve_concurrently(
+        model_mapping.env, [task(field) for field in definition.fields], workers, snapshot=snapshot
+    )
+    return {field.alias or field.name: value for field, value in zip(definition.fields, values)}
+
+
+def parse_model_field(
+    field, model_mapping, variables={}, mutation=False, allowed_fields={}, company_id=None, loader=None
+):
+    model = model_mapping.get(field.name)
+    connection = aggregate = sync = False
+    if model is None and field.name.endswith(CONNECTION_SUFFIX) and not mutation:
+        model = model_mapping.get(field.name[:-len(CONNECTION_SUFFIX)])
+        connection = True
+    elif model is None and field.name.endswith(AGGREGATE_SUFFIX) and not mutation:
+        model = model_mapping.get(field.name[:-len(AGGREGATE_SUFFIX)])
+        aggregate = True
+    elif model is None and field.name.endswith(SYNC_SUFFIX) and not mutation:
+        model = model_mapping.get(field.name[:-len(SYNC_SUFFIX)])
+        sync = True
+    if model is None:
+        raise ValidationError(f"Model {field.name} not found")
+    if company_id:
+        model = model.with_company(company_id)
+    if loader is None:
+        loader = BatchLoader()
+    arguments = parse_arguments(field.arguments, variables=variables)
+    path = (field.alias or field.name,)
+    if connection:
+        return parse_connection(
+            model, field.fields, arguments, loader, variables=variables, allowed_fields=allowed_fields, path=path
+        )
+    if aggregate:
+        return parse_aggregate(
+            model, field.fields, arguments, loader, variables=variables, allowed_fields=allowed_fields, path=path
+        )
+    if sync:
+        return parse_sync(
+            model, field.fields, arguments, loader, variables=variables, allowed_fields=allowed_fields, path=path
+        )
+    records = read_records(
+        model, field.fields, arguments, loader, allowed_fields=allowed_fields, mutation=mutation
+    )
+    return parse_fields(
+        records,
+        field.fields,
+        variables=variables,
+        allowed_fields=allowed_fields,
+        company_id=company_id,
+        loader=loader,
+        path=path,
+    )
+
+
+def get_columns(records, fields, allowed_fields={}):
+    allowed = allowed_fields.get(records._name)
+    columns = []
+    for field in fields:
+        if allowed is not None and field.name not in allowed:
+            _logger.warning("Field %s not allowed in model %s", field.name, records._name)
+        elif field.name not in records._fields:
+            _logger.error("Field %s not found in model %s", field.name, records._name)
+        elif records._fields[field.name].type == "binary":
+            continue  # Only read on demand, see resolve_binary
+        elif field.name not in columns:
+            columns.append(field.name)
+    return tuple(columns)
+
+
+def get_binaries(records, fields, allowed_fields={}):
+    """Return the selected binary fields, which are not part of the columns"""
+    allowed = allowed_fields.get(records._name)
+    return [
+        field
+        for field in fields
+        if field.name in records._fields
+        and records._fields[field.name].type == "binary"
+        and (allowed is None or field.name in allowed)
+    ]
+
+
+def read_records(model, fields, arguments, loader, allowed_fields={}, mutation=False):
+    """Return the records of a root field
+
+    When searching, the selected columns are read by the same `search_read`
+    and primed in the loader, so that the first depth costs no extra read.
+    """
+    if mutation or arguments.get("ids"):
+        return retrieve_records(model, arguments, mutation=mutation)
+    columns = get_columns(model, fields, allowed_fields)
+    rows = model.search_read(
+        arguments.get("domain") or [],
+        list(columns) or ["id"],
+        offset=arguments.get("offset") or 0,
+        limit=arguments.get("limit"),
+        order=arguments.get("order"),
+        load=None,
+    )
+    loader.prime(model, columns, rows)
+    return model.browse([row["id"] for row in rows])
+
+
+def parse_connection(model, fields, arguments, loader, variables={}, allowed_fields={}, path=()):
+    """Resolve the Relay connection form of a root field with keyset pagination
+
+    The cursors hold the values of the ordering terms of their record, which
+    are turned into a WHERE clause instead of an OFFSET.
+    """
+    first, after = arguments.get("first"), arguments.get("after")
+    last, before = arguments.get("last"), arguments.get("before")
+    if first is not None and last is not None:
+        raise ValidationError("Passing both first and last is not supported")
+    if any(size is not None and size < 0 for size in (first, last)):
+        raise ValidationError("first and last must be positive")
+    if any(size is not None and size > MAX_PAGE_SIZE for size in (first, last)):
+        raise ValidationError(f"first and last can not exceed {MAX_PAGE_SIZE}")
+    backward = last is not None or (before is not None and first is None)
+    size = last if backward else first
+    if size is None:
+        size = DEFAULT_PAGE_SIZE
+    cursor = before if backward else after
+
+    terms = parse_order(model, arguments.get("order"))
+    base_domain = arguments.get("domain") or []
+    domain = base_domain
+    if cursor:
+        domain = AND([domain, keyset_domain(terms, decode_cursor(cursor, terms), reverse=backward)])
+
+    node_fields = connection_nodes(fields)
+    columns = get_columns(model, node_fields, allowed_fields)
+    rows = model.search_read(
+        domain,
+        list(dict.fromkeys(columns + tuple(name for name, asc in terms))),
+        limit=size + 1,
+        order=order2str(terms, reverse=backward),
+        load=None,
+    )
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backward:
+        rows.reverse()
+    loader.prime(model, columns, rows)
+    nodes = parse_fields(
+        model.browse([row["id"] for row in rows]),
+        node_fields,
+        variables=variables,
+        allowed_fields=allowed_fields,
+        loader=loader,
+        path=path + ("nodes",),
+    )
+    cursors = [encode_cursor([row[name] for name, asc in terms]) for row in rows]
+
+    page_info = {
+        "hasNextPage": has_more if not backward else before is not None,
+        "hasPreviousPage": has_more if backward else after is not None,
+        "startCursor": cursors[0] if cursors else None,
+        "endCursor": cursors[-1] if cursors else None,
+    }
+    result = {}
+    for selection in fields:
+        key = selection.alias or selection.name
+        if selection.name == "edges":
+            result[key] = [
+                {
+                    edge.alias or edge.name: node if edge.name == "node" else cursor
+                    for edge in selection.fields
+                    if edge.name in ("node", "cursor")
+                }
+                for node, cursor in zip(nodes, cursors)
+            ]
+        elif selection.name == "nodes":
+            result[key] = nodes
+        elif selection.name == "pageInfo":
+            result[key] = {
+                info.alias or info.name: page_info[info.name]
+                for info in selection.fields
+                if info.name in page_info
+            }
+        elif selection.name == "totalCount":
+            if arguments.get("estimate"):  # Cheap on huge tables
+                result[key] = estimate_count(model, base_domain)
             else:
-                _logger.error(f"Fragment {field.name.value} not found in document")
-    return fields
+                result[key] = model.search_count(base_domain)
+    return result
+
+
+def parse_sync(model, fields, arguments, loader, variables={}, allowed_fields={}, path=()):
+    """Resolve the delta-sync form of a root field
+
+    Only the records written after the watermark are read, ordered by
+    (write_date, id), along with the ids deleted since. Archived records
+    are sent too, so that clients can drop them.
+    """
+    if not model._log_access:
+        raise ValidationError(f"Model {model._name} has no write date and can not be synchronized")
+    if model._name not in model.env["graphql.handler"].get_sync_models():
+        raise ValidationError(f"Model {model._name} is not synchronized, see the graphql.sync_models parameter")
+    cutoff = sync_cutoff()
+    since = arguments.get("since")
+    if since:
+        records_position, deleted_position = decode_watermark(since)
+    else:  # Everything is sent, there is no deletion to send
+        records_position, deleted_position = None, [cutoff, 0]
+
+    model = model.with_context(active_test=False)
+    domain = arguments.get("domain") or []
+    if records_position:
+        domain = AND([domain, after_domain(records_position)])
+    limit = arguments.get("limit")
+    record_fields = sync_records(fields)
+    columns = get_columns(model, record_fields, allowed_fields)
+    rows = model.search_read(
+        domain,
+        list(dict.fromkeys(columns + ("write_date",))),
+        limit=None if limit is None else limit + 1,
+        order="write_date asc, id asc",
+        load=None,
+    )
+    more_records = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    loader.prime(model, columns, rows)
+    records = parse_fields(
+        model.browse([row["id"] for row in rows]),
+        record_fields,
+        variables=variables,
+        allowed_fields=allowed_fields,
+        loader=loader,
+        path=path + ("records",),
+    )
+    if rows:
+        records_position = [rows[-1]["write_date"], rows[-1]["id"]]
+    if not more_records:  # The next synchronization starts from the settled changes
+        records_position = settle(records_position, cutoff)
+
+    deleted, more_deleted = [], False
+    if since:
+        logged = model.env["graphql.unlink.log"].sudo()._deleted(
+            model._name, deleted_position, limit=None if limit is None else limit + 1
+        )
+        more_deleted = limit is not None and len(logged) > limit
+        for date, log_id, res_id in logged[:limit]:
+            deleted.append(res_id)
+            deleted_position = [date, log_id]
+        if not more_deleted:
+            # Nothing is left to send up to now, the position follows the cutoff
+            # even without new deletions, and the watermark does not expire
+            deleted_position = settle(None, cutoff)
+    has_more = more_records or more_deleted
+
+    values = {
+        "records": records,
+        "deleted": deleted,
+        "watermark": encode_watermark(records_position, deleted_position),
+        "hasMore": has_more,
+    }
+    return {field.alias or field.name: values[field.name] for field in fields if field.name in values}
+
+
+def parse_aggregate(model, fields, arguments, loader, variables={}, allowed_fields={}, path=()):
+    """Resolve the aggregate form of a root field with a single `read_group`
+
+    Postgres computes the groups, so the response size depends on the number
+    of groups instead of the number of records. Grouped many2one fields can
+    select fields of their records, which are read in one batch.
+    """
+    allowed = allowed_fields.get(model._name)
+    groupby = parse_groupby(model, arguments.get("groupBy"), allowed)
+    groups = model.read_group(
+        arguments.get("domain") or [],
+        aggregate_specs(model, fields, groupby, allowed),
+        list(groupby.values()),
+        offset=arguments.get("offset") or 0,
+        limit=arguments.get("limit"),
+        orderby=arguments.get("order") or False,
+        lazy=False,
+    )
+
+    result = [{} for group in groups]
+    for field in fields:
+        key = field.alias or field.name
+        if field.name == "count" and field.name not in groupby:
+            for values, group in zip(result, groups):
+                values[key] = group["__count"]
+        elif field.name not in groupby:
+            for values, group in zip(result, groups):
+                values[key] = group.get(field.name)
+        elif model._fields[field.name].type == "many2one":
+            # Grouped many2one values are (id, display name) pairs
+            ids = [(group[groupby[field.name]] or (None,))[0] for group in groups]
+            if not field.fields:
+                for values, record_id in zip(result, ids):
+                    values[key] = record_id
+                continue
+            comodel = model.env[model._fields[field.name].comodel_name]
+            records = comodel.browse(list(dict.fromkeys(filter(None, ids))))
+            by_id = parse_level(
+                [(records, field.fields, path + (key,), model._name)],
+                loader,
+                variables=variables,
+                allowed_fields=allowed_fields,
+                depth=1,
+            )[0]
+            for values, record_id in zip(result, ids):
+                values[key] = by_id.get(record_id)
+        else:
+            for values, group in zip(result, groups):
+                values[key] = group.get(groupby[field.name])
+    return result
+
+
+def parse_level(nodes, loader, variables={}, allowed_fields={}, depth=0):
+    """Resolve a whole depth of the query
+
+    `nodes` is a list of (records, fields, path, parent model) tuples. The
+    relations selected by all the nodes are gathered and resolved together at
+    the next depth, so that each depth costs one read per model instead of
+    one per parent. Return, for each node, the values of its records by id.
+    """
+    tracer = loader.tracer
+    state = tracer.start() if tracer else None
+    columns = [get_columns(node[0], node[1], allowed_fields) for node in nodes]
+    rows = loader.read([(node[0], cols) for node, cols in zip(nodes, columns)], depth=depth)
+
+    results = []
+    children = []
+    relations = []
+    for (records, fields, path, parent), cols, by_id in zip(nodes, columns, rows):
+        result = {}
+        for record_id in records.ids:
+            row = by_id.get(record_id)
+            if row is None:
+                continue
+            result[record_id] = {
+                field.alias or field.name: row[field.name]
+                for field in fields
+                if field.name in cols
+            }
+        for field in get_binaries(records, fields, allowed_fields):
+            size = parse_arguments(field.arguments, variables=variables).get("size")
+            resolve_binary(records, field, size, result, loader, allowed=allowed_fields.get(records._name))
+        results.append(result)
+        if tracer and depth:  # The root depth is traced with its root field
+            tracer.stop(state, path, model2name(parent), model2name(records._name), rows=len(result))
+
+        for field in fields:
+            if field.name not in cols or not field.fields:
+                continue
+            model_field = records._fields[field.name]
+            if not model_field.relational:
+                continue
+            key = field.alias or field.name
+            ids = {}  # Ordered set
+            for values in result.values():
+                value = values[key]
+                if model_field.type == "many2one":
+                    value = [value] if value else []
+                ids.update(dict.fromkeys(value))
+            comodel = records.env[model_field.comodel_name]
+            children.append((comodel.browse(list(ids)), field.fields, path + (key,), records._name))
+            relations.append((result, key, model_field.type == "many2one"))
+
+    if children:
+        for (result, key, many2one), by_id in zip(
+            relations,
+            parse_level(children, loader, variables=variables, allowed_fields=allowed_fields, depth=depth + 1),
+        ):
+            for values in result.values():
+                if many2one:
+                    values[key] = by_id.get(values[key]) if values[key] else None
+                else:
+                    values[key] = [by_id[i] for i in values[key] if i in by_id]
+    return results
+
+
+def parse_fields(records, fields, variables={}, allowed_fields={}, company_id=None, loader=None, path=()):
+    if loader is None:
+        loader = BatchLoader()
+    by_id = parse_level([(records, fields, path, None)], loader, variables=variables, allowed_fields=allowed_fields)[0]
+    return [by_id[i] for i in records.ids if i in by_id]